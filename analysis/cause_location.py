@@ -38,12 +38,13 @@ def analyze_cause_by_location(data):
     Groups data by location and individual tags to show cause frequency per city.
     
     Args:
-        data (list): List of dictionaries (your clean outage data).
+        data (list | pd.DataFrame): List of dictionaries (your clean outage data)
+                                    or the typed table from the columnar store.
         
     Returns:
         pd.DataFrame: A pivot table showing tag counts per location.
     """
-    df = pd.DataFrame(data)
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
     
     # 1. Explode the 'tags' column and rename the tags column
     df_exploded = df.explode('tags').rename(columns={'tags': 'Cause'})
@@ -56,7 +57,8 @@ def analyze_cause_by_location(data):
     
     # 2. Group and Count
     # Use the correct, lowercase column name 'location'
-    cause_counts = df_exploded.groupby(['location', 'Cause']).size().reset_index(name='Count')
+    # observed=True: skip location categories with no outages
+    cause_counts = df_exploded.groupby(['location', 'Cause'], observed=True).size().reset_index(name='Count')
     
     # 3. Pivot the Table
     # Pivot the data to get locations as rows and causes as columns.
@@ -64,7 +66,8 @@ def analyze_cause_by_location(data):
         index='location', 
         columns='Cause', 
         values='Count', 
-        fill_value=0
+        fill_value=0,
+        observed=True
     )
     
     # 4. Add a 'Total Outages' column for context (needed by the plotting function)
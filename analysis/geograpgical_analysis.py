@@ -8,17 +8,20 @@ def location_frequency(data):
     Analyzes the frequency of outages per location and returns the summary.
     
     Args:
-        data (list): List of dictionaries (your clean outage data).
+        data (list | pd.DataFrame): List of dictionaries (your clean outage data)
+                                    or the typed table from the columnar store.
         
     Returns:
         pd.DataFrame: A DataFrame showing the count of outages per location.
     """
     
-    df = pd.DataFrame(data)
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
     
     # 1. Count the frequency of each unique location
     # Use .value_counts() on the 'location' column
-    location_summary = df['location'].value_counts().reset_index()
+    location_counts = df['location'].value_counts()
+    # A categorical column also counts the locations that never occur
+    location_summary = location_counts[location_counts > 0].reset_index()
     
     # 2. Rename columns for clarity
     location_summary.columns = ['Location', 'Outage Count']
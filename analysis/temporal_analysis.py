@@ -3,60 +3,57 @@ import matplotlib.pyplot as plt
 import os
 
 import pandas as pd
-from datetime import datetime
+from utils.durations import add_duration_columns, parse_number, parse_year
 
-def monthly_duration(data):
-    # 1. Load data and initial time cleaning
-    df = pd.DataFrame(data) 
-    
-    # ------------------ Existing Time String Code --------------------
-    # Ensure time fields are strings and handle potential 'null' or None values 
-    df['time_start'] = df['time_start'].astype(str).str.replace(r'[:.]', '', regex=True).str.zfill(4)
-    df['time_end'] = df['time_end'].astype(str).str.replace(r'[:.]', '', regex=True).str.zfill(4)
-    
-    # ⚠️ Filtering out 'Unknown' to prevent errors in date parsing
-    # We will use .dropna later to safely handle missing data.
-    df = df[df['time_end'] != 'Unknown'].copy() # Use .copy() to avoid SettingWithCopyWarning
-    
-    # 🟢 STEP 2: Create Datetime Columns for Calculation (RE-INSERTED)
-    df['start_dt'] = pd.to_datetime(
-        df['year'].astype(str) + '-' + df['month'].astype(str) + '-' + df['day'].astype(str) + ' ' + 
-        df['time_start'].str[:2] + ':' + df['time_start'].str[2:], 
-        errors='coerce' # Set invalid dates/times to NaT
-    )
+def aggregate_monthly(df):
+    """
+    Monthly total duration from integer year/month columns and the canonical
+    duration_hours column; both data paths aggregate here, so the report does
+    not depend on which store the analysis read.
+    """
+    df = df.dropna(subset=['duration_hours', 'year', 'month'])
 
-    df['end_dt'] = pd.to_datetime(
-        df['year'].astype(str) + '-' + df['month'].astype(str) + '-' + df['day'].astype(str) + ' ' + 
-        df['time_end'].str[:2] + ':' + df['time_end'].str[2:],
-        errors='coerce'
-    )
-    
-    # 🟢 STEP 3: Calculate Duration (RE-INSERTED)
-    # This creates the 'duration' column needed for aggregation.
-    df['duration'] = (df['end_dt'] - df['start_dt']).dt.total_seconds() / 3600 # Convert to hours
-
-    # 4. Filter Invalid Duration Rows
-    # Safely remove rows where time parsing failed, resulting in NaN duration.
-    df = df.dropna(subset=['duration'])
-    
-    # 5. Aggregate by Year and Month
-    # This line now runs successfully because 'duration' exists on the filtered df.
-    monthly_summary = df.groupby(['year', 'month'])['duration'].sum().reset_index()
-    monthly_summary = monthly_summary.rename(columns={'duration': 'Total Duration (Hours)'})
-    
-    # 6. Optional: Sort and Create SortableDate
-    monthly_summary['month'] = monthly_summary['month'].astype(int)
+    monthly_summary = df.groupby(['year', 'month'])['duration_hours'].sum().reset_index()
+    monthly_summary = monthly_summary.rename(columns={'duration_hours': 'Total Duration (Hours)'})
+    monthly_summary = monthly_summary.astype({'year': int, 'month': int})
     monthly_summary = monthly_summary.sort_values(by=['year', 'month']).reset_index(drop=True)
-    
-    # 🟢 NEW STEP: Create a simple, clean datetime object for the x-axis index
+
     monthly_summary['SortableDate'] = pd.to_datetime(
-        monthly_summary['year'].astype(str).str.split(' ').str[0] + '-' + 
-        monthly_summary['month'].astype(str).str.zfill(2)
+        pd.DataFrame({'year': monthly_summary['year'], 'month': monthly_summary['month'], 'day': 1})
     )
-    
+
     return monthly_summary
 
 
+def monthly_duration_typed(df):
+    """
+    Monthly total duration from the typed columnar table, which already has
+    integer year/month columns and the canonical duration_hours column.
+    """
+    return aggregate_monthly(df[['year', 'month', 'duration_hours']].astype(float))
+
+
+def monthly_duration(data):
+    # Typed table from the columnar store: no string re-parsing needed
+    if isinstance(data, pd.DataFrame) and 'duration_hours' in data.columns:
+        return monthly_duration_typed(data)
+
+    # 1. Load data
+    df = pd.DataFrame(data) 
+    
+    # 2. Parse start/end times and the canonical duration (in hours) in one
+    # vectorized pass; outages past midnight end on the next day
+    df = add_duration_columns(df)
+
+    # 3. Aggregate by integer year and month; an imputed year
+    # ("2020 (Puuttuva vuosi ...)") counts towards its year
+    return aggregate_monthly(pd.DataFrame({
+        'year': parse_year(df['year']),
+        'month': parse_number(df['month']),
+        'duration_hours': df['duration_hours'],
+    }))
+
+
 
 def plot_monthly_duration_line(monthly_summary_df):
     
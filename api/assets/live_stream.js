@@ -0,0 +1,43 @@
+// Live outage dashboard over Server-Sent Events (api/live_push.py).
+// The server sends full figures on connect and then only the new event and
+// the changed figure parts as dash.Patch props, which set_props applies.
+(function () {
+    var cursor = null;
+    var source = null;
+
+    function apply(message) {
+        Object.keys(message.props).forEach(function (id) {
+            window.dash_clientside.set_props(id, message.props[id]);
+        });
+        cursor = message.cursor;
+    }
+
+    function connect() {
+        source = new EventSource('/stream/outages');
+        source.addEventListener('snapshot', function (event) {
+            apply(JSON.parse(event.data));
+        });
+        source.addEventListener('delta', function (event) {
+            var message = JSON.parse(event.data);
+            // A delta applies only on top of the state it was computed from; otherwise start over
+            if (cursor === null || message.base.epoch !== cursor.epoch || message.base.index !== cursor.index) {
+                source.close();
+                cursor = null;
+                connect();
+                return;
+            }
+            apply(message);
+        });
+    }
+
+    function start() {
+        // Wait until Dash has rendered the layout
+        if (window.dash_clientside && window.dash_clientside.set_props && document.getElementById('live-donut-chart')) {
+            connect();
+        } else {
+            setTimeout(start, 100);
+        }
+    }
+
+    start();
+})();
@@ -0,0 +1,351 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from dash import Patch, no_update
+
+# Cause categories produced by geolocation.normalize_cause, in the donut's slice order
+CAUSE_CATEGORIES = ["Huolto", "Kaivuutyöt", "Saneeraus", "Korjaustyöt", "Vauriokorjaus"]
+TOP_LOCATIONS = 5
+
+# Points kept in the cumulative chart; when exceeded, every other point is dropped
+MAX_CUMULATIVE_POINTS = 1000
+
+# Seconds per stream event: the dashboard shows one event per 250 ms tick
+STREAM_INTERVAL = 0.25
+
+DASHBOARD_STATE_PATH = 'data/cache/dashboard_state.sqlite'
+
+DONUT_TITLE = "Keskeytysten syyt (Tapahtumat yhteensä: {total})"
+BAR_TITLE = "5 eniten mainittua kuntaa"
+CUMULATIVE_TITLE = "Kumulatiivinen tapahtumamäärä"
+
+
+def series_stride(count, max_points=MAX_CUMULATIVE_POINTS):
+    """
+    Stride of the downsampled cumulative series after `count` events: the
+    smallest power of two that keeps it within `max_points`. The series is
+    the events 0, stride, 2 * stride, ... so it follows from the count alone.
+    """
+    stride = 1
+    while -(-count // stride) > max_points:
+        stride *= 2
+    return stride
+
+
+def location_rank(name, count):
+    """Sort key of the top municipalities: most events first, ties by name."""
+    return -count, name
+
+
+class DashboardState:
+    """
+    Running aggregates of the outage stream shown by the dashboard: events
+    per cause category and per municipality, and the top municipalities.
+    Every event is counted in O(1) plus a check against the top 5.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.index = 0
+        self.cause_counts = dict.fromkeys(CAUSE_CATEGORIES, 0)
+        self.location_counts = {}
+        self.top_locations = []
+
+    def add(self, causes, location):
+        """Count one event with its normalized cause categories and municipality."""
+        for cause in causes:
+            self.cause_counts[cause] = self.cause_counts.get(cause, 0) + 1
+
+        count = self.location_counts.get(location, 0) + 1
+        self.location_counts[location] = count
+        self.index += 1
+
+        # Only `location` can have moved in the top list
+        top = self.top_locations
+        if location not in top:
+            last = top[-1] if len(top) == TOP_LOCATIONS else None
+            if last is not None and location_rank(location, count) > location_rank(last, self.location_counts[last]):
+                return
+            top.append(location)
+        top.sort(key=lambda name: location_rank(name, self.location_counts[name]))
+        del top[TOP_LOCATIONS:]
+
+    def snapshot(self, epoch=0):
+        return {
+            'epoch': epoch,
+            'index': self.index,
+            'cause_counts': dict(self.cause_counts),
+            'top_locations': [(name, self.location_counts[name]) for name in self.top_locations],
+        }
+
+
+class MemoryAggregateStore:
+    """
+    Dashboard aggregates shared by all viewers of one process.
+
+    The stream position follows the clock: tick t shows event t % len(stream),
+    and every wrap-around starts a new epoch from zero counts. Whichever
+    callback comes first applies the events up to the current tick, once;
+    viewers only read the snapshot and keep their own cursor.
+
+    Args:
+        causes (list): Normalized cause categories of every stream event.
+        locations (list): Municipality of every stream event.
+        interval (float): Seconds per event.
+    """
+
+    def __init__(self, causes, locations, interval=STREAM_INTERVAL):
+        self.causes = causes
+        self.locations = locations
+        self.interval = interval
+        self.started_at = time.time()
+        self.state = DashboardState()
+        self.epoch = 0
+        # Events aggregated by this store, to compare with per-viewer aggregation
+        self.applied = 0
+        self.lock = threading.Lock()
+
+    def current_tick(self, now=None):
+        return int(((now or time.time()) - self.started_at) / self.interval)
+
+    def advance(self, tick=None):
+        """Apply the stream up to `tick` (the current tick if None)."""
+        epoch, count = divmod(self.current_tick() if tick is None else tick, len(self.causes))
+        count += 1
+        if (self.epoch, self.state.index) >= (epoch, count):
+            return
+        with self.lock:
+            # Another callback may have applied a later tick while this one waited
+            if (self.epoch, self.state.index) >= (epoch, count):
+                return
+            if epoch != self.epoch:
+                self.state.reset()
+                self.epoch = epoch
+            for i in range(self.state.index, count):
+                self.state.add(self.causes[i], self.locations[i])
+                self.applied += 1
+
+    def read(self):
+        """Current aggregates (see DashboardState.snapshot)."""
+        with self.lock:
+            return self.state.snapshot(self.epoch)
+
+
+class SQLiteAggregateStore:
+    """
+    Dashboard aggregates in SQLite, shared by every worker process using the
+    same file. The start time is stored with the counts, so all workers agree
+    on the stream position; the first worker to see a new tick applies it in
+    an immediate transaction and the others only read.
+
+    Same interface as MemoryAggregateStore. Each thread gets its own connection.
+    """
+
+    def __init__(self, causes, locations, path=DASHBOARD_STATE_PATH, interval=STREAM_INTERVAL):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.causes = causes
+        self.locations = locations
+        self.path = path
+        self.interval = interval
+        self.applied = 0
+        self.local = threading.local()
+
+        conn = self._connection()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS causes (cause TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS locations (location TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES (?, ?)",
+                [('started_at', time.time()), ('epoch', 0), ('idx', 0)],
+            )
+        self.started_at = self._meta(conn)['started_at']
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            # Transactions are managed explicitly in advance
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    @staticmethod
+    def _meta(conn):
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def current_tick(self, now=None):
+        return int(((now or time.time()) - self.started_at) / self.interval)
+
+    def advance(self, tick=None):
+        epoch, count = divmod(self.current_tick() if tick is None else tick, len(self.causes))
+        count += 1
+        conn = self._connection()
+        meta = self._meta(conn)
+        if (meta['epoch'], meta['idx']) >= (epoch, count):
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another worker may have applied the tick while this one waited for the lock
+            meta = self._meta(conn)
+            if (meta['epoch'], meta['idx']) < (epoch, count):
+                start = int(meta['idx'])
+                if epoch != meta['epoch']:
+                    conn.execute("DELETE FROM causes")
+                    conn.execute("DELETE FROM locations")
+                    start = 0
+
+                causes = Counter(cause for i in range(start, count) for cause in self.causes[i])
+                locations = Counter(self.locations[i] for i in range(start, count))
+                conn.executemany(
+                    "INSERT INTO causes (cause, count) VALUES (?, ?) "
+                    "ON CONFLICT(cause) DO UPDATE SET count = count + excluded.count",
+                    causes.items(),
+                )
+                conn.executemany(
+                    "INSERT INTO locations (location, count) VALUES (?, ?) "
+                    "ON CONFLICT(location) DO UPDATE SET count = count + excluded.count",
+                    locations.items(),
+                )
+                conn.executemany("UPDATE meta SET value = ? WHERE key = ?", [(epoch, 'epoch'), (count, 'idx')])
+                self.applied += count - start
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def read(self):
+        conn = self._connection()
+        # One read transaction, so the counts and the position match
+        conn.execute("BEGIN")
+        try:
+            meta = self._meta(conn)
+            cause_counts = dict.fromkeys(CAUSE_CATEGORIES, 0)
+            cause_counts.update(conn.execute("SELECT cause, count FROM causes").fetchall())
+            top = conn.execute(
+                "SELECT location, count FROM locations ORDER BY count DESC, location LIMIT ?", (TOP_LOCATIONS,)
+            ).fetchall()
+        finally:
+            conn.execute("COMMIT")
+
+        return {'epoch': int(meta['epoch']), 'index': int(meta['idx']), 'cause_counts': cause_counts,
+                'top_locations': top}
+
+    def close(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+# Figures are plain dicts: dcc.Graph accepts them as they are, and building
+# go.Figure objects (with validation) took ~18 ms per new viewer
+
+def donut_figure(snapshot):
+    """Full cause donut; the slices are fixed, so later updates only change the values."""
+    return {
+        'data': [{
+            'type': 'pie',
+            'labels': CAUSE_CATEGORIES,
+            'values': [snapshot['cause_counts'].get(cause, 0) for cause in CAUSE_CATEGORIES],
+            'hole': .4,
+            'textinfo': 'label+percent',
+            'sort': False,
+        }],
+        'layout': {'title': {'text': DONUT_TITLE.format(total=snapshot['index'])}},
+    }
+
+
+def bar_figure(snapshot):
+    return {
+        'data': [{
+            'type': 'bar',
+            'x': [name for name, _ in snapshot['top_locations']],
+            'y': [count for _, count in snapshot['top_locations']],
+        }],
+        'layout': {
+            'title': {'text': BAR_TITLE},
+            'xaxis': {'title': {'text': 'Kunta'}},
+            'yaxis': {'title': {'text': 'Tapahtumien lkm'}},
+        },
+    }
+
+
+def cumulative_figure(snapshot, max_points=MAX_CUMULATIVE_POINTS):
+    points = list(range(0, snapshot['index'], series_stride(snapshot['index'], max_points)))
+    return {
+        'data': [{'type': 'scatter', 'mode': 'lines', 'x': points, 'y': points}],
+        'layout': {
+            'title': {'text': CUMULATIVE_TITLE},
+            'xaxis': {'title': {'text': 'Kulunut sykeaika (x 250ms)'}},
+            'yaxis': {'title': {'text': 'Tapahtumien kokonaislkm'}},
+        },
+    }
+
+
+def figure_updates(snapshot, cursor, max_points=MAX_CUMULATIVE_POINTS):
+    """
+    Figure outputs taking one viewer from its `cursor` to `snapshot`.
+
+    A viewer without a cursor, or one left in an earlier epoch, gets the full
+    figures. Otherwise the donut and bar values are assigned whole in a Patch
+    (five numbers each, so a lost update is corrected by the next one) and
+    the cumulative chart gets only its new points, or the thinned series
+    after downsampling.
+
+    Args:
+        snapshot (dict): Aggregates from the store's read().
+        cursor (dict): The viewer's {'epoch', 'index', 'stride'}, or None.
+
+    Returns:
+        tuple: (donut, bar, cumulative, new cursor); figures, Patch objects or
+               dash.no_update when the viewer is already up to date.
+    """
+    index = snapshot['index']
+    stride = series_stride(index, max_points)
+    new_cursor = {'epoch': snapshot['epoch'], 'index': index, 'stride': stride}
+
+    if cursor is None or cursor['epoch'] != snapshot['epoch'] or cursor['index'] > index:
+        return donut_figure(snapshot), bar_figure(snapshot), cumulative_figure(snapshot, max_points), new_cursor
+    if cursor['index'] == index:
+        return no_update, no_update, no_update, cursor
+
+    donut = Patch()
+    donut['data'][0]['values'] = [snapshot['cause_counts'].get(cause, 0) for cause in CAUSE_CATEGORIES]
+    donut['layout']['title']['text'] = DONUT_TITLE.format(total=index)
+
+    bar = Patch()
+    bar['data'][0]['x'] = [name for name, _ in snapshot['top_locations']]
+    bar['data'][0]['y'] = [count for _, count in snapshot['top_locations']]
+
+    cumulative = no_update
+    if cursor['stride'] != stride:
+        cumulative = Patch()
+        points = list(range(0, index, stride))
+        cumulative['data'][0]['x'] = points
+        cumulative['data'][0]['y'] = points
+    else:
+        # First multiple of the stride the viewer does not have yet
+        points = list(range(-(-cursor['index'] // stride) * stride, index, stride))
+        if points:
+            cumulative = Patch()
+            cumulative['data'][0]['x'].extend(points)
+            cumulative['data'][0]['y'].extend(points)
+
+    return donut, bar, cumulative, new_cursor
+
+
+def viewer_update(store, cursor, tick=None):
+    """
+    Advance the shared store to the current tick and return the outputs for
+    one viewer (see figure_updates).
+    """
+    store.advance(tick)
+    return figure_updates(store.read(), cursor)
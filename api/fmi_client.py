@@ -0,0 +1,188 @@
+import asyncio
+import random
+import aiohttp
+from fmiopendata.multipoint import MultiPoint
+
+STORED_QUERY_URL = "https://opendata.fmi.fi/wfs?service=WFS&version=2.0.0&request=getFeature&storedquery_id="
+
+# Requests in flight at once; FMI open data allows a limited request rate per client
+MAX_CONCURRENCY = 4
+
+# Retry transient failures with exponential backoff and full jitter
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+REQUEST_TIMEOUT = 60
+
+
+class AsyncFMIClient:
+    """
+    asyncio client for FMI stored queries.
+
+    One aiohttp session is reused for all requests, a semaphore bounds the
+    number of requests in flight, transient failures (timeouts, connection
+    errors, 429 and 5xx answers) are retried with exponential backoff and
+    jitter, and identical queries in flight at the same time share one request.
+
+    Use as an async context manager:
+
+        async with AsyncFMIClient() as client:
+            obs = await client.stored_query(query_id, args)
+    """
+
+    def __init__(self, base_url=STORED_QUERY_URL, max_concurrency=MAX_CONCURRENCY, retries=MAX_RETRIES,
+                 backoff=BACKOFF_SECONDS, max_backoff=MAX_BACKOFF_SECONDS, timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = None
+        self.semaphore = None
+        self.in_flight = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    def url(self, query_id, args):
+        """Request URL of a stored query, built the same way as fmiopendata does."""
+        url = self.base_url + query_id
+        if args:
+            url = url + "&" + "&".join(args)
+        return url
+
+    async def _get(self, url):
+        """GET `url` within the concurrency limit, retrying transient failures."""
+        for attempt in range(self.retries + 1):
+            async with self.semaphore:
+                self.requests += 1
+                try:
+                    async with self.session.get(url) as response:
+                        if response.status not in RETRY_STATUSES:
+                            response.raise_for_status()
+                            return await response.read()
+                        error = aiohttp.ClientResponseError(
+                            response.request_info, response.history, status=response.status
+                        )
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    error = e
+
+            if attempt == self.retries:
+                raise error
+
+            # Full jitter: sleep a random time up to the exponential limit
+            self.retried += 1
+            await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    async def fetch_xml(self, query_id, args=None):
+        """
+        Fetch the response XML of a stored query. A query that is already in
+        flight is not requested again; the callers share its response.
+        """
+        url = self.url(query_id, args)
+        task = self.in_flight.get(url)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(self._get(url))
+        self.in_flight[url] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self.in_flight.pop(url, None)
+            else:
+                task.add_done_callback(lambda _: self.in_flight.pop(url, None))
+
+    async def stored_query(self, query_id, args=None):
+        """
+        Fetch and parse a multipointcoverage stored query; the result is the
+        same MultiPoint object fmiopendata's download_stored_query returns.
+        """
+        args = list(args or [])
+        timeseries = "timeseries=True" in args
+        if timeseries:
+            args.remove("timeseries=True")
+
+        xml = await self.fetch_xml(query_id, args)
+        # Parsing may look up field labels over HTTP, so keep it off the event loop
+        return await asyncio.to_thread(MultiPoint, xml, query_id, timeseries)
+
+    async def stored_queries(self, calls):
+        """
+        Run many (query_id, args) queries concurrently.
+
+        Returns:
+            list: Parsed results in the order of `calls`; a failed query gives its exception.
+        """
+        return await asyncio.gather(
+            *(self.stored_query(query_id, args) for query_id, args in calls), return_exceptions=True
+        )
+
+
+class FMIClient:
+    """
+    Synchronous front end of AsyncFMIClient.
+
+    An instance can be passed wherever fmiopendata's download_stored_query is
+    expected (`query=` arguments in api/weather.py); `query_many` runs a batch
+    of queries concurrently on a private event loop.
+    """
+
+    def __init__(self, **client_kwargs):
+        self.client_kwargs = client_kwargs
+        self.stats = {'requests': 0, 'coalesced': 0, 'retried': 0}
+
+    def __call__(self, query_id, args=None):
+        result = self.query_many([(query_id, args)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def query_many(self, calls):
+        """Run (query_id, args) queries concurrently; failures are returned as exceptions."""
+        return asyncio.run(self._query_many(calls))
+
+    async def _query_many(self, calls):
+        async with AsyncFMIClient(**self.client_kwargs) as client:
+            results = await client.stored_queries(calls)
+        self.stats['requests'] += client.requests
+        self.stats['coalesced'] += client.coalesced
+        self.stats['retried'] += client.retried
+        return results
+
+
+def run_queries(query, calls):
+    """
+    Run (query_id, args) queries with `query`: concurrently if it is an
+    FMIClient, otherwise one after another.
+
+    Returns:
+        list: Results in the order of `calls`; a failed query gives its exception.
+    """
+    if hasattr(query, 'query_many'):
+        return query.query_many(calls)
+
+    results = []
+    for query_id, args in calls:
+        try:
+            results.append(query(query_id, args=list(args)))
+        except Exception as e:
+            results.append(e)
+    return results
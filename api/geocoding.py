@@ -0,0 +1,160 @@
+import csv
+import os
+import sqlite3
+import time
+
+GAZETTEER_PATH = 'data/external/gazetteer.sqlite'
+
+# Bundled coordinates of the municipalities and villages in the service area
+SEED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer_fi.csv')
+
+# SQLite limits the number of parameters of one query
+LOOKUP_BATCH = 500
+
+
+def normalize_name(name):
+    """Key used in the gazetteer: lowercase, surrounding whitespace removed."""
+    return name.strip().lower()
+
+
+class Gazetteer:
+    """
+    Persistent place name -> (latitude, longitude) store backed by SQLite.
+
+    A new store is seeded from the bundled municipality file; coordinates
+    resolved by a remote provider are written back with their source.
+    """
+
+    def __init__(self, path=GAZETTEER_PATH, seed_path=SEED_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS places (
+                   name TEXT PRIMARY KEY,
+                   display_name TEXT,
+                   latitude REAL NOT NULL,
+                   longitude REAL NOT NULL,
+                   source TEXT
+               )"""
+        )
+        if seed_path:
+            self.seed(seed_path)
+
+    def seed(self, seed_path):
+        """Insert the places of a name,latitude,longitude CSV file that are not stored yet."""
+        with open(seed_path, 'r', encoding='utf-8', newline='') as file:
+            rows = [
+                (row['name'], float(row['latitude']), float(row['longitude']))
+                for row in csv.DictReader(file)
+            ]
+        self.add_many(rows, source='bundled', replace=False)
+
+    def add_many(self, rows, source='remote', replace=True):
+        """Store (name, latitude, longitude) rows."""
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        with self.conn:
+            self.conn.executemany(
+                f"{verb} INTO places (name, display_name, latitude, longitude, source) VALUES (?, ?, ?, ?, ?)",
+                [(normalize_name(name), name, lat, lon, source) for name, lat, lon in rows],
+            )
+
+    def lookup_many(self, names):
+        """
+        Look up many names with a few batched queries.
+
+        Returns:
+            dict: name -> (latitude, longitude) for the names that are stored.
+        """
+        keys = {}
+        for name in names:
+            keys.setdefault(normalize_name(name), []).append(name)
+
+        found = {}
+        key_list = list(keys)
+        for i in range(0, len(key_list), LOOKUP_BATCH):
+            batch = key_list[i:i + LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            query = f"SELECT name, latitude, longitude FROM places WHERE name IN ({placeholders})"
+            for key, lat, lon in self.conn.execute(query, batch):
+                for name in keys[key]:
+                    found[name] = (lat, lon)
+        return found
+
+    def close(self):
+        self.conn.close()
+
+
+class NominatimProvider:
+    """
+    Remote provider using OpenStreetMap Nominatim through geopy, rate limited.
+    geopy is only imported once the first name has to be geocoded remotely.
+    """
+
+    def __init__(self, user_agent="keskeytys_analyysi_app_v2", min_delay_seconds=1.5):
+        self.user_agent = user_agent
+        self.min_delay_seconds = min_delay_seconds
+        self.geocode_query = None
+
+    def geocode(self, name):
+        if self.geocode_query is None:
+            from geopy.geocoders import Nominatim
+            from geopy.extra.rate_limiter import RateLimiter
+
+            geolocator = Nominatim(user_agent=self.user_agent)
+            self.geocode_query = RateLimiter(geolocator.geocode, min_delay_seconds=self.min_delay_seconds)
+
+        try:
+            result = self.geocode_query(f"{name}, Finland")
+        except Exception:
+            time.sleep(2)
+            return None
+        if result:
+            return result.latitude, result.longitude
+        return None
+
+
+class StubProvider:
+    """Offline provider answering from a fixed name -> (latitude, longitude) dict."""
+
+    def __init__(self, coordinates=None):
+        self.coordinates = coordinates or {}
+        self.calls = 0
+
+    def geocode(self, name):
+        self.calls += 1
+        return self.coordinates.get(name)
+
+
+class Geocoder:
+    """
+    Batch geocoder: resolves names from the gazetteer in bulk and asks the
+    remote provider only for the misses, storing what it finds.
+    """
+
+    def __init__(self, gazetteer=None, provider=None):
+        self.gazetteer = gazetteer or Gazetteer()
+        self.provider = provider
+
+    def geocode_many(self, names):
+        """
+        Returns:
+            dict: name -> (latitude, longitude), or (None, None) if unresolved.
+        """
+        names = [name for name in dict.fromkeys(names) if isinstance(name, str)]
+        found = self.gazetteer.lookup_many(names)
+        misses = [name for name in names if name not in found]
+
+        if misses and self.provider is not None:
+            print(f"Geocoding {len(misses)} new locations remotely...")
+            resolved = []
+            for i, name in enumerate(misses):
+                coordinates = self.provider.geocode(name)
+                if coordinates:
+                    found[name] = coordinates
+                    resolved.append((name, *coordinates))
+                if (i + 1) % 10 == 0:
+                    print(f" ...Geocoded {i + 1}/{len(misses)}")
+            self.gazetteer.add_many(resolved)
+
+        return {name: found.get(name, (None, None)) for name in names}
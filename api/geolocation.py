@@ -12,16 +12,19 @@
 
 # %%
 # Kirjastojen tuonti
+import os
 import urllib.parse
 import json
 import pandas as pd
 import re # Tarvitaan regular expressioneille
 from pathlib import Path 
-from datetime import datetime, timedelta 
+
+from utils.durations import duration_hours
+
+from api.dashboard import MemoryAggregateStore, SQLiteAggregateStore
+from api.live_push import LivePublisher
 
 from dash import dcc, html, Dash
-from dash.dependencies import Output, Input
-import plotly.express as px
 
 
 # %%
@@ -90,19 +93,37 @@ except FileNotFoundError:
     raise FileNotFoundError(f"outage_data.json ei löydy polusta: {FILE_PATH}")
 
 # %%
-# Globaali tila Dash-sovelluksen käyttöön
-stream_state = {
-    'index': 0,
-    # Tagit ovat nyt normalisoituja syy-kategorioita
-    'tag_counts': {}, 
-    # Kuntien lukumäärä
-    'location_counts': {}
-}
+# Kestot tunneissa lasketaan kerralla koko streamille (yli keskiyön jatkuvat katkot päättyvät seuraavana päivänä)
+STREAM_DURATIONS = duration_hours(
+    [entry.get('time_start') for entry in STREAM_DATA],
+    [entry.get('time_end') for entry in STREAM_DATA],
+)
+
+# %%
+# Syy-kategoriat ja kunnat lasketaan myös kerralla, ettei regexejä ajeta joka sykkeellä
+STREAM_CAUSES = [
+    [cause for cause in map(normalize_cause, entry.get('tags') or []) if cause]
+    for entry in STREAM_DATA
+]
+STREAM_LOCATIONS = [location_map.get(entry.get('location'), entry.get('location')) for entry in STREAM_DATA]
+
+# %%
+# Jaettu tila: stream etenee kellon mukaan (yksi tapahtuma / 250 ms) ja laskurit päivitetään
+# kerran kaikille katsojille. Jokaisella katsojalla on vain oma kursori (dcc.Store selaimessa).
+# Useamman workerin kanssa (esim. gunicorn api.geolocation:server) tila jaetaan SQLite-tiedostossa:
+# aseta DASHBOARD_STATE_PATH, esim. data/cache/dashboard_state.sqlite
+DASHBOARD_STATE_PATH = os.environ.get('DASHBOARD_STATE_PATH')
+
+if DASHBOARD_STATE_PATH:
+    stream_store = SQLiteAggregateStore(STREAM_CAUSES, STREAM_LOCATIONS, path=DASHBOARD_STATE_PATH)
+else:
+    stream_store = MemoryAggregateStore(STREAM_CAUSES, STREAM_LOCATIONS)
 print(f"Stream size: {len(STREAM_DATA)} events.")
 
 # %%
 # Initialize Dash app
 app = Dash(__name__)
+server = app.server
 
 # %%
 # --- Dashboard Asettelu (Layout) ---
@@ -128,131 +149,41 @@ app.layout = html.Div([
     
     # 4. Aikasarjakaavio (Cumulative Events)
     html.Div(dcc.Graph(id='cumulative-events-chart')),
-    
-    # Interval Component: Syke, joka käynnistää päivityksen 250ms välein
-    dcc.Interval(
-        id='interval-component',
-        interval=250, # 250 milliseconds (0.25s)
-        n_intervals=0
-    )
 ])
 
 # %%
-# --- DASH CALLBACK: Päivitysfunktio ---
-@app.callback(
-    [Output('live-donut-chart', 'figure'), 
-     Output('live-bar-chart', 'figure'),
-     Output('latest-event-text', 'children'),
-     Output('cumulative-events-chart', 'figure')],
-    Input('interval-component', 'n_intervals')
-)
-def update_dashboard(n):
-    global stream_state
-    
-    i = stream_state['index']
-    
-    # Jos stream loppuu, aloitetaan alusta
-    if i >= len(STREAM_DATA):
-        stream_state['index'] = 0 
-        i = 0
-        stream_state['tag_counts'] = {} 
-        stream_state['location_counts'] = {}
-    
+# --- Viimeisimmän tapahtuman teksti ---
+def event_text(i):
     new_entry_raw = STREAM_DATA[i]
-    
     location_name_raw = new_entry_raw.get('location')
-    location_name = location_map.get(location_name_raw, location_name_raw)
-
-    # Laske kesto tunneissa (logiikka pysyy samana)
-    duration_h = 0
-    try:
-        start_str = new_entry_raw['time_start'].replace('.', ':')
-        end_str = new_entry_raw['time_end'].replace('.', ':')
-        time_format = '%H:%M' if ':' in start_str else '%H'
-        
-        t_start = datetime.strptime(start_str, time_format)
-        t_end = datetime.strptime(end_str, time_format)
-        
-        time_delta = t_end - t_start
-        if time_delta.total_seconds() < 0:
-             time_delta = timedelta(days=1) + time_delta
-             
-        duration_h = time_delta.total_seconds() / 3600
 
-    except ValueError:
+    # Kesto tunneissa (esilaskettu, tuntematon aika -> 0)
+    duration_h = STREAM_DURATIONS[i]
+    if pd.isna(duration_h):
         duration_h = 0
-        
-    # 3. Päivitä globaali Tila
-    
-    # A) Avainsanojen laskenta - KÄYTÄÄN normalize_cause-funktiota
-    current_normalized_tags = []
-    for tag in new_entry_raw.get('tags', []):
-        normalized_cause = normalize_cause(tag)
-        if normalized_cause:
-            # LISÄTTY: Laske vain normalisoidut ja hyväksytyt syyt
-            stream_state['tag_counts'][normalized_cause] = stream_state['tag_counts'].get(normalized_cause, 0) + 1
-            current_normalized_tags.append(normalized_cause) # Kerätään teksti-ilmoitusta varten
-
-    # B) Sijaintien laskenta
-    stream_state['location_counts'][location_name] = stream_state['location_counts'].get(location_name, 0) + 1
-
-
-    stream_state['index'] += 1
 
-    # --- ELEMENT 1: Donitsikaavio (Avainsanojen osuus) ---
-    tag_df = pd.DataFrame(
-        list(stream_state['tag_counts'].items()), 
-        columns=['Kategoria', 'Lukumäärä']
-    )
-    
-    if tag_df.empty:
-        donut_fig = px.pie(title=f"Keskeytysten syyt (Tapahtumat yhteensä: {i+1})")
-    else:
-        donut_fig = px.pie(
-            tag_df, 
-            values='Lukumäärä', 
-            names='Kategoria', 
-            title=f"Keskeytysten syyt (Tapahtumat yhteensä: {i+1})",
-        )
-        donut_fig.update_traces(hole=.4, textinfo='label+percent') 
-        
-    # --- ELEMENT 2: Bar Chart (Top 5 Kunnat) ---
-    bar_df = pd.DataFrame(
-        list(stream_state['location_counts'].items()), 
-        columns=['Kunta', 'Lukumäärä']
-    )
-    bar_df = bar_df.sort_values('Lukumäärä', ascending=False).head(5)
-
-    bar_fig = px.bar(
-        bar_df, 
-        x='Kunta', 
-        y='Lukumäärä', 
-        title="5 eniten mainittua kuntaa",
-        labels={'Lukumäärä': 'Tapahtumien lkm'}
-    )
-
-    # --- ELEMENT 3: Text Display ---
     # Nyt näytetään vain normalisoidut syyt, jos niitä löytyy
+    current_normalized_tags = STREAM_CAUSES[i]
     tag_display = ', '.join(current_normalized_tags) if current_normalized_tags else "Ei tunnistettua syytä"
-    
-    latest_event_text = (
+
+    return (
         f"Sijainti: **{location_name_raw}** | Kesto: {new_entry_raw['time_start']} - {new_entry_raw['time_end']} (**{duration_h:.2f} h**)"
         f" | Syy-kategoria: {tag_display}"
     )
-    
-    # --- ELEMENT 4: Cumulative Events Chart ---
-    cumulative_events_fig = px.line(
-        x=list(range(i+1)), 
-        y=[n for n in range(i+1)], 
-        title="Kumulatiivinen tapahtumamäärä",
-        labels={'x': 'Kulunut sykeaika (x 250ms)', 'y': 'Tapahtumien kokonaislkm'}
-    )
 
-    return donut_fig, bar_fig, latest_event_text, cumulative_events_fig
+
+# %%
+# --- Päivitykset palvelimelta (Server-Sent Events) ---
+# Selaimet eivät enää kysele palvelimelta 250 ms välein. Julkaisija etenee streamissa
+# kerran per tapahtuma ja lähettää kaikille yhteyksille vain uuden tapahtuman ja
+# kuvaajien muuttuneet osat (dash.Patch); uusi sivu saa ensin täydet kuvaajat.
+# Selainpuolen koodi: assets/live_stream.js (Dash lataa sen automaattisesti).
+publisher = LivePublisher(stream_store, event_text).register(server).start()
 
 
 # %%
-# Aja sovellus VS Code Jupyter Notebookissa
-app.run(port=8050)
+# Aja sovellus VS Code Jupyter Notebookissa (gunicorn käyttää suoraan `server`-oliota)
+if __name__ == '__main__':
+    app.run(port=8050)
 
 # %%
\ No newline at end of file
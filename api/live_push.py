@@ -0,0 +1,176 @@
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+import plotly.utils
+from dash import no_update
+from flask import Response, request, stream_with_context
+
+from api.dashboard import figure_updates
+
+STREAM_ROUTE = '/stream/outages'
+
+# Messages kept for clients that reconnect (Last-Event-ID) or fall behind
+HISTORY = 256
+
+# Seconds between keep-alive comments on an idle connection
+HEARTBEAT = 15
+
+FIGURE_IDS = ('live-donut-chart', 'live-bar-chart', 'cumulative-events-chart')
+TEXT_ID = 'latest-event-text'
+
+
+def sse_message(message_id, kind, data):
+    return f"id: {message_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+class LivePublisher:
+    """
+    Pushes the dashboard to its viewers as Server-Sent Events instead of
+    every viewer polling for it.
+
+    While anyone is connected, a background thread advances the shared
+    store once per stream tick and publishes what changed: the new event's
+    text and the changed figure parts as dash.Patch props (see
+    figure_updates). Each message is serialized once for all clients. A new
+    client first gets a snapshot with the full figures, then the same deltas
+    as everyone else. With no new events the server only sends a keep-alive
+    comment every `heartbeat` seconds. The browser side is
+    assets/live_stream.js.
+
+    Args:
+        store: MemoryAggregateStore or SQLiteAggregateStore.
+        describe (callable): Text of the stream event at an index.
+    """
+
+    def __init__(self, store, describe, history=HISTORY, heartbeat=HEARTBEAT):
+        self.store = store
+        self.describe = describe
+        self.heartbeat = heartbeat
+        self.messages = deque(maxlen=history)
+        self.last_id = 0
+        # Where the last published message left the clients
+        self.cursor = None
+        self.snapshot = None
+        self.subscribers = 0
+        self.connected = threading.Event()
+        self.condition = threading.Condition()
+        self.step_lock = threading.Lock()
+        self.thread = None
+
+    def _data(self, outputs, cursor, base):
+        props = {
+            component_id: {'figure': output}
+            for component_id, output in zip(FIGURE_IDS, outputs) if output is not no_update
+        }
+        props[TEXT_ID] = {'children': self.describe(cursor['index'] - 1)}
+        # Patch objects serialize through to_plotly_json
+        return json.dumps({'base': base, 'cursor': cursor, 'props': props, 'sent_at': time.time()},
+                          cls=plotly.utils.PlotlyJSONEncoder)
+
+    def step(self, tick=None):
+        """Advance the store and publish the changes; returns False if there were none."""
+        with self.step_lock:
+            self.store.advance(tick)
+            snapshot = self.store.read()
+            *outputs, cursor = figure_updates(snapshot, self.cursor)
+            if cursor == self.cursor:
+                return False
+
+            # Full figures (a new epoch, or the first message) replace whatever the client has
+            kind = 'snapshot' if isinstance(outputs[0], dict) else 'delta'
+            data = self._data(outputs, cursor, None if kind == 'snapshot' else self.cursor)
+            with self.condition:
+                self.last_id += 1
+                self.messages.append((self.last_id, kind, data))
+                self.cursor = cursor
+                self.snapshot = snapshot
+                self.condition.notify_all()
+            return True
+
+    def snapshot_message(self):
+        """(message id, data) of full figures matching the last published message."""
+        if self.snapshot is None:
+            self.step()
+        with self.condition:
+            message_id, snapshot = self.last_id, self.snapshot
+        *outputs, cursor = figure_updates(snapshot, None)
+        return message_id, self._data(outputs, cursor, None)
+
+    def wait(self, after_id):
+        """
+        Messages published after `after_id`, waiting up to `heartbeat` seconds
+        for one. Returns an empty list on timeout, and None if the client has
+        fallen behind the kept history.
+        """
+        with self.condition:
+            if self.last_id == after_id:
+                self.condition.wait(self.heartbeat)
+            if self.last_id == after_id:
+                return []
+            first = self.messages[0][0]
+            if after_id < first - 1:
+                return None
+            return list(itertools.islice(self.messages, after_id - first + 1, None))
+
+    def _subscribe(self, delta):
+        with self.condition:
+            self.subscribers += delta
+            if self.subscribers:
+                self.connected.set()
+            else:
+                self.connected.clear()
+
+    def events(self, last_event_id=None):
+        """SSE stream of one client; resumes after `last_event_id` if it is still in the history."""
+        self._subscribe(1)
+        try:
+            after = None
+            if last_event_id and last_event_id.isdigit():
+                with self.condition:
+                    if self.messages and self.messages[0][0] - 1 <= int(last_event_id) <= self.last_id:
+                        after = int(last_event_id)
+            if after is None:
+                after, data = self.snapshot_message()
+                yield sse_message(after, 'snapshot', data)
+
+            while True:
+                messages = self.wait(after)
+                if messages is None:
+                    after, data = self.snapshot_message()
+                    yield sse_message(after, 'snapshot', data)
+                elif not messages:
+                    yield ": keep-alive\n\n"
+                for message_id, kind, data in messages or []:
+                    yield sse_message(message_id, kind, data)
+                    after = message_id
+        finally:
+            self._subscribe(-1)
+
+    def run(self):
+        """Publish on every stream tick while clients are connected; sleeps otherwise."""
+        while True:
+            self.connected.wait()
+            # Sleep to the next tick of the stream clock
+            tick = self.store.current_tick()
+            time.sleep(max(0.0, self.store.started_at + (tick + 1) * self.store.interval - time.time()))
+            self.step()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='live-publisher', daemon=True)
+        self.thread.start()
+        return self
+
+    def register(self, server, route=STREAM_ROUTE):
+        """Serve the stream from the Flask server under Dash (app.server)."""
+        def outage_stream():
+            return Response(
+                stream_with_context(self.events(request.headers.get('Last-Event-ID'))),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+            )
+
+        server.add_url_rule(route, 'outage_stream', outage_stream)
+        return self
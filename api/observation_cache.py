@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import time
+import pandas as pd
+
+OBSERVATION_CACHE_PATH = 'data/cache/observations.sqlite'
+
+# FMI may still add or correct observations of the last couple of days, so
+# those hours expire after RECENT_TTL; older hours are kept permanently
+RECENT_WINDOW = 48 * 3600
+RECENT_TTL = 3600
+
+# Size cap in observation rows; the least recently used hours are evicted first
+MAX_CACHE_ROWS = 2_000_000
+
+# SQLite limits the number of parameters of one query
+LOOKUP_BATCH = 500
+
+HOUR_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def hour_key(hour):
+    """Key of a (naive UTC) hour in the cache."""
+    return pd.Timestamp(hour).floor('h').strftime(HOUR_FORMAT)
+
+
+def cache_scope(bbox, parameters):
+    """Coverage scope of a query: which area and parameters an hour was fetched for."""
+    return f"{bbox}|{parameters or '*'}"
+
+
+class ObservationCache:
+    """
+    Persistent weather observation cache backed by SQLite.
+
+    Observations are stored one row per (station, hour, parameter). A second
+    table records which hours have been fetched for which query scope (bounding
+    box and parameters), so an hour where no station reported is not fetched
+    again either. Hits and misses are counted per requested hour.
+    """
+
+    def __init__(self, path=OBSERVATION_CACHE_PATH, recent_window=RECENT_WINDOW, ttl=RECENT_TTL,
+                 max_rows=MAX_CACHE_ROWS):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.recent_window = recent_window
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS observations (
+                       station TEXT NOT NULL,
+                       hour TEXT NOT NULL,
+                       parameter TEXT NOT NULL,
+                       value REAL,
+                       unit TEXT,
+                       fmisid INTEGER,
+                       latitude REAL,
+                       longitude REAL,
+                       PRIMARY KEY (station, hour, parameter)
+                   )"""
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS observations_hour ON observations (hour)")
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS coverage (
+                       scope TEXT NOT NULL,
+                       hour TEXT NOT NULL,
+                       fetched_at REAL NOT NULL,
+                       last_used REAL NOT NULL,
+                       PRIMARY KEY (scope, hour)
+                   )"""
+            )
+
+    def is_fresh(self, hour, fetched_at, now=None):
+        """Historical hours never expire; recent hours expire `ttl` seconds after fetching."""
+        now = time.time() if now is None else now
+        hour_time = pd.Timestamp(hour).tz_localize('UTC').timestamp()
+        if hour_time < now - self.recent_window:
+            return True
+        return now - fetched_at <= self.ttl
+
+    def _batched(self, query, keys, prefix=()):
+        rows = []
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[i:i + LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows.extend(self.conn.execute(query.format(placeholders=placeholders), [*prefix, *batch]))
+        return rows
+
+    def missing_hours(self, scope, hours):
+        """
+        Return the hours of `hours` that are not cached, or are cached but
+        stale, for `scope`.
+        """
+        keys = sorted({hour_key(hour) for hour in hours})
+        fetched = dict(self._batched(
+            "SELECT hour, fetched_at FROM coverage WHERE scope = ? AND hour IN ({placeholders})",
+            keys, prefix=(scope,),
+        ))
+
+        now = time.time()
+        missing = [key for key in keys if key not in fetched or not self.is_fresh(key, fetched[key], now)]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        return [pd.Timestamp(key) for key in missing]
+
+    def store(self, scope, hours, frame):
+        """
+        Save the observations of one fetched window and mark its `hours` as
+        fetched for `scope`.
+
+        Args:
+            frame (pd.DataFrame): Long format observations with station, fmisid,
+                                  latitude, longitude, time, parameter, unit and value columns.
+        """
+        now = time.time()
+        rows = [
+            (row.station, hour_key(row.time), row.parameter, None if pd.isna(row.value) else float(row.value),
+             row.unit, None if pd.isna(row.fmisid) else int(row.fmisid), row.latitude, row.longitude)
+            for row in frame.itertuples(index=False)
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO observations "
+                "(station, hour, parameter, value, unit, fmisid, latitude, longitude) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO coverage (scope, hour, fetched_at, last_used) VALUES (?, ?, ?, ?)",
+                [(scope, hour_key(hour), now, now) for hour in hours],
+            )
+
+    def load(self, scope, hours, bbox=None, parameter_keys=None):
+        """
+        Load the cached observations of `hours` and mark them as used.
+
+        Args:
+            scope (str): Coverage scope whose hours are marked as used.
+            bbox (str): "lon_min,lat_min,lon_max,lat_max"; only stations inside it are returned.
+            parameter_keys (tuple): Parameters to return (default: all).
+
+        Returns:
+            pd.DataFrame: Observations in the same long format `store` takes.
+        """
+        keys = sorted({hour_key(hour) for hour in hours})
+        rows = self._batched(
+            "SELECT station, fmisid, latitude, longitude, hour, parameter, unit, value "
+            "FROM observations WHERE hour IN ({placeholders})",
+            keys,
+        )
+        frame = pd.DataFrame(rows, columns=['station', 'fmisid', 'latitude', 'longitude', 'time', 'parameter',
+                                            'unit', 'value'])
+        frame['time'] = pd.to_datetime(frame['time'], format=HOUR_FORMAT)
+        frame['value'] = frame['value'].astype(float)
+
+        if parameter_keys:
+            frame = frame[frame['parameter'].isin(parameter_keys)]
+        if bbox:
+            lon_min, lat_min, lon_max, lat_max = map(float, bbox.split(','))
+            frame = frame[frame['longitude'].between(lon_min, lon_max) & frame['latitude'].between(lat_min, lat_max)]
+
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE coverage SET last_used = ? WHERE scope = ? AND hour = ?",
+                [(now, scope, key) for key in keys],
+            )
+        return frame.reset_index(drop=True)
+
+    def evict(self):
+        """
+        Drop the least recently used hours until the cache holds at most
+        `max_rows` observation rows.
+
+        Returns:
+            int: Number of evicted hours.
+        """
+        total = self.conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+        if total <= self.max_rows:
+            return 0
+
+        # Hours ordered by their latest use in any scope, with their row counts
+        hours = self.conn.execute(
+            """SELECT c.hour, COUNT(o.hour)
+               FROM (SELECT hour, MAX(last_used) AS last_used FROM coverage GROUP BY hour) c
+               LEFT JOIN observations o ON o.hour = c.hour
+               GROUP BY c.hour ORDER BY MAX(c.last_used)"""
+        ).fetchall()
+
+        evicted = []
+        for hour, count in hours:
+            if total <= self.max_rows:
+                break
+            evicted.append((hour,))
+            total -= count
+
+        with self.conn:
+            self.conn.executemany("DELETE FROM observations WHERE hour = ?", evicted)
+            self.conn.executemany("DELETE FROM coverage WHERE hour = ?", evicted)
+
+        print(f"Evicted {len(evicted)} cached observation hours")
+        return len(evicted)
+
+    def stats(self):
+        """Return hit/miss counts of this session and the size of the cache."""
+        requested = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requested if requested else 0.0,
+            'rows': self.conn.execute("SELECT COUNT(*) FROM observations").fetchone()[0],
+            'hours': self.conn.execute("SELECT COUNT(DISTINCT hour) FROM coverage").fetchone()[0],
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,102 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0
+
+# Stations looked at first; rows whose k nearest stations have no value look further
+DEFAULT_K = 5
+
+
+class StationRegistry:
+    """
+    Weather stations indexed by location with a haversine BallTree.
+
+    Lookups are vectorized: one call answers the nearest stations of a whole
+    array of outage coordinates, O(log n) per outage. Stations without
+    coordinates are kept in the registry but never returned as nearest.
+    """
+
+    def __init__(self, names, latitudes, longitudes, fmisids=None):
+        self.names = np.asarray(names, dtype=object)
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.fmisids = np.asarray(fmisids if fmisids is not None else [None] * len(self.names), dtype=object)
+
+        # Registry indices of the stations in the tree; BallTree rejects NaN coordinates
+        self.located = np.flatnonzero(~(np.isnan(self.latitudes) | np.isnan(self.longitudes)))
+        self.tree = None
+        if len(self.located):
+            points = np.column_stack([self.latitudes[self.located], self.longitudes[self.located]])
+            self.tree = BallTree(np.radians(points), metric='haversine')
+
+    @classmethod
+    def from_observations(cls, observations, stations=None):
+        """
+        Build the registry from an observation table (station, fmisid,
+        latitude, longitude columns), optionally in the order of `stations`.
+        """
+        meta = observations.drop_duplicates('station').set_index('station')
+        if stations is not None:
+            meta = meta.loc[list(stations)]
+        return cls(meta.index, meta['latitude'], meta['longitude'], meta['fmisid'])
+
+    def __len__(self):
+        return len(self.names)
+
+    def nearest(self, latitudes, longitudes, k=DEFAULT_K):
+        """
+        Return the k nearest stations of every point.
+
+        Returns:
+            tuple: (distances in km, station indices), both of shape (n, k).
+                   Points with missing coordinates get inf / -1.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        k = min(k, len(self.located))
+
+        distances = np.full((len(latitudes), k), np.inf)
+        indices = np.full((len(latitudes), k), -1)
+        valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        if self.tree is None or k == 0 or not valid.any():
+            return distances, indices
+
+        found_distances, found_indices = self.tree.query(
+            np.radians(np.column_stack([latitudes[valid], longitudes[valid]])), k=k
+        )
+        distances[valid] = found_distances * EARTH_RADIUS_KM
+        indices[valid] = self.located[found_indices]
+        return distances, indices
+
+    def nearest_valid(self, latitudes, longitudes, values, rows, k=DEFAULT_K):
+        """
+        Pick for every point the nearest station that has a value.
+
+        Args:
+            values (np.ndarray): (time, station) grid, columns in registry order.
+            rows (np.ndarray): Row of `values` to use for each point.
+            k (int): Stations tried first; points where all of them are NaN
+                     fall back to the next nearest ones.
+
+        Returns:
+            np.ndarray: Station index per point, -1 where no station has a value.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        chosen = np.full(len(latitudes), -1)
+        pending = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+        k = min(k, len(self.located))
+
+        while pending.size and k > 0:
+            _, indices = self.nearest(latitudes[pending], longitudes[pending], k)
+            has_value = ~np.isnan(values[rows[pending][:, None], indices])
+            found = has_value.any(axis=1)
+            first = has_value.argmax(axis=1)
+
+            chosen[pending[found]] = indices[found, first[found]]
+            pending = pending[~found]
+            if k == len(self.located):
+                break
+            k = min(k * 4, len(self.located))
+
+        return chosen
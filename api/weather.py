@@ -1,23 +1,292 @@
 import datetime as dt
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
 from fmiopendata.wfs import download_stored_query
+from api.observation_cache import cache_scope
+from api.stations import StationRegistry
+from api.fmi_client import run_queries
 
-def weatherApi():
-    """Fetch the weather data using FMI API."""
+MULTIPOINT_QUERY = "fmi::observations::weather::multipointcoverage"
+
+# Bounding boxes (lon_min, lat_min, lon_max, lat_max): the Savon Voima service area and all of Finland
+SERVICE_AREA_BBOX = "25.0,61.5,30.5,64.5"
+FINLAND_BBOX = "18,55,35,75"
+
+# Observation parameter keys: fmiopendata names the series by their label
+TEMPERATURE_KEYS = ("Air temperature", "t2m")
+
+# Observations further than this from an outage hour are not used
+MAX_HOUR_GAP = pd.Timedelta(hours=1)
+
+OBSERVATION_COLUMNS = ['station', 'fmisid', 'latitude', 'longitude', 'time', 'parameter', 'unit', 'value']
+
+
+def weatherApi(cache=None, bbox=FINLAND_BBOX, query=download_stored_query):
+    """
+    Fetch the latest hourly observations of every station in `bbox` using FMI API.
+
+    With an ObservationCache the current hour is only fetched again once its
+    cached copy has expired.
+
+    Returns:
+        dict: station -> parameter -> {'value': ..., 'units': ...}
+    """
     # Generate time window (last 1 hour)
-    end_time = dt.datetime.utcnow()
-    start_time = end_time - dt.timedelta(hours=1)
-
-    start_time = start_time.isoformat(timespec="seconds") + "Z"
-    end_time = end_time.isoformat(timespec="seconds") + "Z"
-
-    # Fetch data from FMI API (FMI Open Data Service)
-    obs = download_stored_query(
-        "fmi::observations::weather::multipointcoverage",
-        args=["bbox=18,55,35,75",  # Bounding box for the area (latitude, longitude)
-              "starttime=" + start_time,
-              "endtime=" + end_time]
-    )
-
-    # Get the latest observation time step
-    latest_tstep = max(obs.data.keys())  # Get the latest observation time step
-    return obs.data[latest_tstep]  # Return the data
+    end_time = pd.Timestamp(dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)).floor('h')
+    start_time = end_time - pd.Timedelta(hours=1)
+    hours = [start_time, end_time]
+
+    if cache is None:
+        observations = fetch_observation_window(start_time, end_time, bbox, query, parameters=None)
+    else:
+        scope = cache_scope(bbox, None)
+        if cache.missing_hours(scope, hours):
+            cache.store(scope, hours, fetch_observation_window(start_time, end_time, bbox, query, parameters=None))
+        observations = cache.load(scope, hours, bbox)
+
+    # Latest observation of every station and parameter
+    observations = observations.dropna(subset=['value']).sort_values('time')
+    latest = observations.drop_duplicates(['station', 'parameter'], keep='last')
+
+    data = {}
+    for row in latest.itertuples(index=False):
+        data.setdefault(row.station, {})[row.parameter] = {'value': row.value, 'units': row.unit}
+    return data
+
+
+def to_utc_hours(timestamps):
+    """Convert naive Finnish local timestamps to naive UTC, rounded to the nearest hour."""
+    local = pd.to_datetime(pd.Series(timestamps))
+    utc = local.dt.tz_localize('Europe/Helsinki', ambiguous='NaT', nonexistent='shift_forward').dt.tz_convert('UTC')
+    return utc.dt.round('h').dt.tz_localize(None)
+
+
+def observations_to_frame(obs, parameter_keys=None):
+    """
+    Flatten a timeseries multipointcoverage response into one row per
+    (station, time, parameter) with columns station, fmisid, latitude,
+    longitude, time, parameter, unit and value.
+    """
+    frames = []
+    for station, series in obs.data.items():
+        meta = obs.location_metadata.get(station, {})
+        for key, param in series.items():
+            if key == 'times' or (parameter_keys and key not in parameter_keys):
+                continue
+            frames.append(pd.DataFrame({
+                'station': station,
+                'fmisid': meta.get('fmisid'),
+                'latitude': meta.get('latitude', np.nan),
+                'longitude': meta.get('longitude', np.nan),
+                'time': pd.to_datetime(series['times']),
+                'parameter': key,
+                'unit': param.get('unit'),
+                'value': np.asarray(param['values'], dtype=float),
+            }))
+
+    if not frames:
+        return pd.DataFrame(columns=OBSERVATION_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def observation_window_args(start_utc, end_utc, bbox=SERVICE_AREA_BBOX, parameters='t2m'):
+    """Stored query arguments for hourly observations of every station in `bbox`."""
+    args = [
+        f"bbox={bbox}",
+        f"starttime={start_utc:%Y-%m-%dT%H:%M:%SZ}",
+        f"endtime={end_utc:%Y-%m-%dT%H:%M:%SZ}",
+    ]
+    if parameters:
+        args.append(f"parameters={parameters}")
+    return args + ["timestep=60", "timeseries=True"]
+
+
+def fetch_observation_window(start_utc, end_utc, bbox=SERVICE_AREA_BBOX, query=download_stored_query, parameters='t2m'):
+    """
+    Fetch hourly observations of every station in `bbox` for one time window
+    with a single multipointcoverage query. `parameters=None` fetches all of them.
+    """
+    args = observation_window_args(start_utc, end_utc, bbox, parameters)
+    return observations_to_frame(query(MULTIPOINT_QUERY, args=args))
+
+
+def build_observation_table(utc_hours, window='D', bbox=SERVICE_AREA_BBOX, query=download_stored_query, cache=None):
+    """
+    Fetch the temperatures needed for `utc_hours` with one query per window
+    ('D' = day, 'W' = week; FMI serves at most a week per query). With an
+    FMIClient as `query` the windows are fetched concurrently.
+
+    With an ObservationCache only the windows containing uncached hours are
+    fetched, so re-running after new outages were added fetches only their hours.
+
+    Returns:
+        pd.DataFrame: Temperature observations of all needed hours.
+    """
+    hours = pd.Series(pd.to_datetime(utc_hours)).dropna().drop_duplicates()
+    # The join may fall back to the neighbouring hours
+    needed = pd.concat([hours - MAX_HOUR_GAP, hours, hours + MAX_HOUR_GAP]).drop_duplicates()
+
+    if cache is not None:
+        scope = cache_scope(bbox, 't2m')
+        missing = pd.Series(cache.missing_hours(scope, needed), dtype='datetime64[ns]')
+    else:
+        missing = needed
+
+    windows = [
+        (period, period.start_time - MAX_HOUR_GAP, period.end_time.floor('h') + MAX_HOUR_GAP)
+        for period in missing.dt.to_period(window).unique()
+    ]
+    if windows:
+        print(f"Fetching {len(windows)} weather windows...")
+    results = run_queries(query, [(MULTIPOINT_QUERY, observation_window_args(start, end, bbox)) for _, start, end in windows])
+
+    frames = []
+    for (period, start, end), obs in zip(windows, results):
+        if isinstance(obs, Exception):
+            print(f"Weather query for {period} failed: {obs}")
+            continue
+
+        frame = observations_to_frame(obs)
+        if cache is not None:
+            cache.store(scope, pd.date_range(start, end, freq='h'), frame)
+        else:
+            frames.append(frame)
+
+    if cache is not None:
+        observations = cache.load(scope, needed, bbox, TEMPERATURE_KEYS)
+        cache.evict()
+    elif frames:
+        observations = pd.concat(frames, ignore_index=True)
+    else:
+        observations = pd.DataFrame(columns=OBSERVATION_COLUMNS)
+
+    observations = observations[observations['parameter'].isin(TEMPERATURE_KEYS)]
+    return observations.drop_duplicates(['station', 'time']).reset_index(drop=True)
+
+
+def join_nearest_observation(latitudes, longitudes, utc_hours, observations):
+    """
+    For every outage take the observation of the nearest station that has a
+    valid value at the nearest observed hour.
+
+    Returns:
+        tuple: (values, station names) as arrays, NaN / None where nothing matched.
+    """
+    n = len(latitudes)
+    values = np.full(n, np.nan)
+    stations_out = np.full(n, None, dtype=object)
+    if observations.empty or n == 0:
+        return values, stations_out
+
+    # (hour, station) matrix of observed values
+    matrix = observations.pivot_table(index='time', columns='station', values='value', aggfunc='first')
+    hours = matrix.index.values
+    grid = matrix.to_numpy()
+
+    # Nearest observed hour for each outage
+    targets = pd.to_datetime(pd.Series(utc_hours)).values
+    pos = np.clip(np.searchsorted(hours, targets), 1, max(len(hours) - 1, 1))
+    before, after = hours[pos - 1], hours[np.minimum(pos, len(hours) - 1)]
+    hour_idx = np.where(np.abs(targets - before) <= np.abs(after - targets), pos - 1, np.minimum(pos, len(hours) - 1))
+    hour_ok = ~pd.isna(targets) & (np.abs(hours[hour_idx] - targets) <= MAX_HOUR_GAP.to_timedelta64())
+
+    # Nearest station with a value at that hour, from the station BallTree
+    registry = StationRegistry.from_observations(observations, matrix.columns)
+    nearest = registry.nearest_valid(latitudes, longitudes, grid, hour_idx)
+    found = hour_ok & (nearest >= 0)
+
+    values[found] = grid[hour_idx[found], nearest[found]]
+    stations_out[found] = registry.names[nearest[found]]
+    return values, stations_out
+
+
+def enrich_with_weather(df, window='D', bbox=SERVICE_AREA_BBOX, query=download_stored_query, cache=None):
+    """
+    Add the air temperature at outage start to every row of `df` (needs
+    latitude, longitude and a local start_timestamp column) using one FMI
+    query per time window instead of one per row.
+
+    Returns:
+        pd.DataFrame: Copy of `df` with lampotila_celsius and station_id columns.
+    """
+    df = df.copy()
+    utc_hours = to_utc_hours(df['start_timestamp']).to_numpy()
+
+    observations = build_observation_table(utc_hours, window, bbox, query, cache)
+    values, stations = join_nearest_observation(df['latitude'].to_numpy(), df['longitude'].to_numpy(), utc_hours, observations)
+
+    df['lampotila_celsius'] = values
+    df['station_id'] = stations
+    return df
+
+
+class RecordedQuery:
+    """
+    Stand-in for fmiopendata's download_stored_query that replays recorded
+    responses from `directory`. With a `live` query function, responses that
+    are not recorded yet are fetched and saved, so a live run can record the
+    fixtures for later offline runs.
+    """
+
+    def __init__(self, directory, live=None):
+        self.directory = directory
+        self.live = live
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, query_id, args):
+        key = hashlib.sha1(json.dumps([query_id, list(args)]).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.json')
+
+    def __call__(self, query_id, args=None):
+        args = list(args or [])
+        path = self._path(query_id, args)
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                return RecordedResponse.from_json(json.load(file))
+
+        if self.live is None:
+            raise FileNotFoundError(f"No recorded response for {query_id} {args}")
+
+        # fmiopendata removes 'timeseries=True' from the list it is given
+        obs = self.live(query_id, args=list(args))
+        response = RecordedResponse(obs.data, obs.location_metadata)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(response.to_json(), file)
+        return response
+
+
+class RecordedResponse:
+    """Minimal MultiPoint look-alike (timeseries layout) that can be saved as JSON."""
+
+    def __init__(self, data, location_metadata):
+        self.data = data
+        self.location_metadata = location_metadata
+
+    def to_json(self):
+        data = {}
+        for station, series in self.data.items():
+            data[station] = {'times': [t.isoformat() for t in series['times']]}
+            for key, param in series.items():
+                if key != 'times':
+                    data[station][key] = {
+                        'values': [None if np.isnan(v) else float(v) for v in param['values']],
+                        'unit': param.get('unit'),
+                    }
+        return {'data': data, 'location_metadata': self.location_metadata}
+
+    @classmethod
+    def from_json(cls, payload):
+        data = {}
+        for station, series in payload['data'].items():
+            data[station] = {'times': [dt.datetime.fromisoformat(t) for t in series['times']]}
+            for key, param in series.items():
+                if key != 'times':
+                    data[station][key] = {
+                        'values': [np.nan if v is None else v for v in param['values']],
+                        'unit': param.get('unit'),
+                    }
+        return cls(data, payload['location_metadata'])
@@ -0,0 +1,92 @@
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.utils
+from dash import no_update
+
+from api.dashboard import CAUSE_CATEGORIES, MemoryAggregateStore, series_stride, viewer_update
+
+LOCATIONS = ["Kuopio", "Iisalmi", "Varkaus", "Siilinjärvi", "Lapinlahti", "Suonenjoki", "Joroinen", "Keitele"]
+
+
+def synthetic_stream(size, seed=0):
+    """(causes, location) pairs of `size` normalized stream events."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(0, 3, size)
+    causes = rng.choice(CAUSE_CATEGORIES, counts.sum())
+    cause_lists = np.split(causes, np.cumsum(counts)[:-1])
+    # Some municipalities more frequent than others, so the top 5 settles
+    weights = np.linspace(2, 1, len(LOCATIONS))
+    locations = rng.choice(LOCATIONS, size, p=weights / weights.sum())
+    return [(list(c), str(loc)) for c, loc in zip(cause_lists, locations)]
+
+
+def legacy_figures(i, tag_counts, location_counts):
+    """The previous callback body: DataFrames and complete px figures every tick."""
+    tag_df = pd.DataFrame(list(tag_counts.items()), columns=['Kategoria', 'Lukumäärä'])
+    donut_fig = px.pie(tag_df, values='Lukumäärä', names='Kategoria', title=f"Tapahtumat yhteensä: {i+1}")
+    donut_fig.update_traces(hole=.4, textinfo='label+percent')
+
+    bar_df = pd.DataFrame(list(location_counts.items()), columns=['Kunta', 'Lukumäärä'])
+    bar_df = bar_df.sort_values('Lukumäärä', ascending=False).head(5)
+    bar_fig = px.bar(bar_df, x='Kunta', y='Lukumäärä')
+
+    cumulative_fig = px.line(x=list(range(i+1)), y=[n for n in range(i+1)])
+    return donut_fig, bar_fig, cumulative_fig
+
+
+def payload_bytes(outputs):
+    """Size of the JSON the callback would send, leaving out unchanged outputs."""
+    return sum(
+        len(json.dumps(output, cls=plotly.utils.PlotlyJSONEncoder))
+        for output in outputs if output is not no_update
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard callback latency and payload vs stream position")
+    parser.add_argument('--events', type=int, default=50_000)
+    parser.add_argument('--positions', type=int, nargs='+', default=[100, 1000, 10_000, 49_000])
+    parser.add_argument('--ticks', type=int, default=20, help='Ticks measured at every position')
+    args = parser.parse_args()
+
+    stream = synthetic_stream(args.events)
+    store = MemoryAggregateStore([causes for causes, _ in stream], [location for _, location in stream])
+    cursor = None
+    tag_counts, location_counts = {}, {}
+    positions = sorted(args.positions)
+
+    print(f"{'event':>7s} {'legacy ms':>10s} {'legacy KB':>10s} {'patch ms':>9s} {'patch KB':>9s}")
+    for i, (causes, location) in enumerate(stream):
+        for cause in causes:
+            tag_counts[cause] = tag_counts.get(cause, 0) + 1
+        location_counts[location] = location_counts.get(location, 0) + 1
+
+        start = time.perf_counter()
+        *outputs, cursor = viewer_update(store, cursor, tick=i)
+        patch_seconds = time.perf_counter() - start
+
+        if positions and positions[0] <= i < positions[0] + args.ticks:
+            if i == positions[0]:
+                rows = []
+            start = time.perf_counter()
+            legacy = legacy_figures(i, tag_counts, location_counts)
+            legacy_seconds = time.perf_counter() - start
+            rows.append((legacy_seconds, payload_bytes(legacy), patch_seconds, payload_bytes(outputs)))
+
+            if i == positions[0] + args.ticks - 1:
+                legacy_s, legacy_b, patch_s, patch_b = np.mean(rows, axis=0)
+                print(f"{positions[0]:7d} {legacy_s * 1000:10.1f} {legacy_b / 1000:10.1f}"
+                      f" {patch_s * 1000:9.3f} {patch_b / 1000:9.2f}")
+                positions.pop(0)
+
+    stride = series_stride(len(stream))
+    print(f"Cumulative chart: {-(-len(stream) // stride)} points kept, one per {stride} ticks")
+
+
+if __name__ == "__main__":
+    main()
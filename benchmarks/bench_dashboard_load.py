@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import plotly.utils
+from dash import no_update
+
+from api.dashboard import MemoryAggregateStore, SQLiteAggregateStore, viewer_update
+from benchmarks.bench_dashboard import synthetic_stream
+
+
+def make_store(backend, causes, locations, interval, path):
+    if backend == 'sqlite':
+        return SQLiteAggregateStore(causes, locations, path=path, interval=interval)
+    return MemoryAggregateStore(causes, locations, interval=interval)
+
+
+def client(store, seconds, poll, latencies):
+    """One viewer: poll every `poll` seconds, from a random phase, until `seconds` have passed."""
+    cursor = None
+    next_poll = time.perf_counter() + random.uniform(0, poll)
+    deadline = time.perf_counter() + seconds
+    while next_poll < deadline:
+        time.sleep(max(0.0, next_poll - time.perf_counter()))
+        start = time.perf_counter()
+        *outputs, cursor = viewer_update(store, cursor)
+        # Dash serializes the outputs before responding
+        json.dumps([output for output in outputs if output is not no_update], cls=plotly.utils.PlotlyJSONEncoder)
+        latencies.append(time.perf_counter() - start)
+        next_poll += poll
+
+
+def run_worker(args):
+    """
+    Run `clients` viewer threads in this process.
+
+    Returns:
+        tuple: (callback latencies in seconds, events aggregated by the stores)
+    """
+    backend, clients, seconds, poll, interval, events, path = args
+    stream = synthetic_stream(events)
+    causes = [c for c, _ in stream]
+    locations = [loc for _, loc in stream]
+
+    # 'per-viewer' gives every client its own aggregates, as a per-session dict would
+    if backend == 'per-viewer':
+        stores = [make_store('memory', causes, locations, interval, path) for _ in range(clients)]
+    else:
+        stores = [make_store(backend, causes, locations, interval, path)] * clients
+
+    latencies = []
+    threads = [threading.Thread(target=client, args=(store, seconds, poll, latencies)) for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(store.applied for store in set(stores))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard callback latency with many concurrent viewers")
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--poll', type=float, default=0.25, help='Seconds between a client\'s callbacks')
+    parser.add_argument('--interval', type=float, default=0.01, help='Seconds per stream event')
+    parser.add_argument('--events', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, default=2, help='Processes sharing the SQLite store')
+    parser.add_argument('--backends', nargs='+', default=['per-viewer', 'memory', 'sqlite'])
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients polling every {args.poll * 1000:.0f} ms for {args.seconds:.0f} s, "
+          f"one stream event per {args.interval * 1000:.0f} ms")
+    print(f"{'backend':14s} {'callbacks':>9s} {'p50 ms':>7s} {'p99 ms':>7s} {'events aggregated':>18s}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            workers = args.workers if backend == 'sqlite' else 1
+            path = os.path.join(directory, f"{backend}.sqlite")
+            tasks = [
+                (backend, args.clients // workers + (i < args.clients % workers), args.seconds, args.poll,
+                 args.interval, args.events, path)
+                for i in range(workers)
+            ]
+            if workers == 1:
+                results = [run_worker(tasks[0])]
+            else:
+                with Pool(workers) as pool:
+                    results = pool.map(run_worker, tasks)
+
+            latencies = np.concatenate([latencies for latencies, _ in results]) * 1000
+            applied = sum(applied for _, applied in results)
+            name = f"{backend} x{workers}" if workers > 1 else backend
+            print(f"{name:14s} {len(latencies):9d} {np.percentile(latencies, 50):7.2f}"
+                  f" {np.percentile(latencies, 99):7.2f} {applied:18d}")
+
+
+if __name__ == "__main__":
+    main()
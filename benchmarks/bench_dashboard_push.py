@@ -0,0 +1,164 @@
+import argparse
+import http.client
+import json
+import logging
+import threading
+import time
+from multiprocessing import Event, Process
+
+import numpy as np
+from dash import Dash, dcc, html, no_update
+from dash.dependencies import Input, Output, State
+from flask import jsonify
+from werkzeug.serving import make_server
+
+from api.dashboard import MemoryAggregateStore, viewer_update
+from api.live_push import STREAM_ROUTE, LivePublisher
+from benchmarks.bench_dashboard import synthetic_stream
+
+OUTPUTS = [('live-donut-chart', 'figure'), ('live-bar-chart', 'figure'), ('latest-event-text', 'children'),
+           ('cumulative-events-chart', 'figure'), ('viewer-cursor', 'data')]
+
+
+def build_app(mode, interval, events):
+    """The dashboard served by interval polling (the previous design) or by push."""
+    stream = synthetic_stream(events)
+    store = MemoryAggregateStore([c for c, _ in stream], [loc for _, loc in stream], interval=interval)
+    describe = lambda i: f"Sijainti: **{stream[i][1]}** | Syy-kategoria: {', '.join(stream[i][0])}"
+
+    app = Dash(__name__)
+    app.layout = html.Div([dcc.Graph(id=component_id) for component_id, _ in OUTPUTS[:4]]
+                          + [dcc.Store(id='viewer-cursor'), dcc.Interval(id='interval-component', interval=250)])
+
+    if mode == 'poll':
+        @app.callback([Output(*output) for output in OUTPUTS], Input('interval-component', 'n_intervals'),
+                      State('viewer-cursor', 'data'))
+        def update_dashboard(n, cursor):
+            donut, bar, cumulative, new_cursor = viewer_update(store, cursor)
+            if new_cursor == cursor:
+                return (no_update,) * len(OUTPUTS)
+            return donut, bar, describe(new_cursor['index'] - 1), cumulative, new_cursor
+    else:
+        LivePublisher(store, describe).register(app.server).start()
+
+    # For the clients: when event 0 was shown, and the server's CPU time
+    app.server.add_url_rule('/bench/info', 'info', lambda: jsonify(
+        started_at=store.started_at, interval=store.interval, cpu=time.process_time()))
+    return app
+
+
+def serve(mode, interval, events, port, ready):
+    # Logging every request would dominate the polling server's CPU time
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', port, build_app(mode, interval, events).server, threaded=True)
+    ready.set()
+    server.serve_forever()
+
+
+def get_json(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('GET', path)
+    return json.loads(conn.getresponse().read())
+
+
+def event_time(info, index):
+    """Time the event bringing the stream to `index` became current on the server (epoch 0)."""
+    return info['started_at'] + (index - 1) * info['interval']
+
+
+def poll_client(port, info, seconds, poll, lags):
+    """Request the dashboard callback every `poll` seconds like dcc.Interval does."""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    cursor, n = None, 0
+    body = {
+        'output': '..' + '...'.join(f"{i}.{p}" for i, p in OUTPUTS) + '..',
+        'outputs': [{'id': i, 'property': p} for i, p in OUTPUTS],
+        'changedPropIds': ['interval-component.n_intervals'],
+    }
+    deadline = time.time() + seconds
+    next_poll = time.time() + np.random.uniform(0, poll)
+    while next_poll < deadline:
+        time.sleep(max(0.0, next_poll - time.time()))
+        body['inputs'] = [{'id': 'interval-component', 'property': 'n_intervals', 'value': n}]
+        body['state'] = [{'id': 'viewer-cursor', 'property': 'data', 'value': cursor}]
+        conn.request('POST', '/_dash-update-component', json.dumps(body), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        data = response.read()
+        # Nothing new: Dash answers 204, or 200 with no outputs
+        updated = json.loads(data)['response'] if response.status == 200 else {}
+        if 'viewer-cursor' in updated:
+            new_cursor = updated['viewer-cursor']['data']
+            if cursor is not None and new_cursor['index'] > cursor['index']:
+                lags.append(time.time() - event_time(info, new_cursor['index']))
+            cursor = new_cursor
+        n += 1
+        next_poll += poll
+
+
+def push_client(port, info, seconds, lags):
+    """Hold one SSE connection and time every message against its event."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=seconds + 30)
+    conn.request('GET', STREAM_ROUTE)
+    response = conn.getresponse()
+    deadline = time.time() + seconds
+    kind = None
+    while time.time() < deadline:
+        line = response.readline()
+        if not line:
+            break
+        if line.startswith(b'event: '):
+            kind = line[7:].strip()
+        elif line.startswith(b'data: ') and kind == b'delta':
+            lags.append(time.time() - event_time(info, json.loads(line[6:])['cursor']['index']))
+    conn.close()
+
+
+def run(mode, scenario, clients, seconds, events, port):
+    # An idle stream shows its first event and then nothing new during the run
+    interval = 0.25 if scenario == 'active' else 1e6
+    ready = Event()
+    server = Process(target=serve, args=(mode, interval, events, port, ready), daemon=True)
+    server.start()
+    ready.wait()
+    info = get_json(port, '/bench/info')
+
+    lags = []
+    if mode == 'poll':
+        threads = [threading.Thread(target=poll_client, args=(port, info, seconds, 0.25, lags)) for _ in range(clients)]
+    else:
+        threads = [threading.Thread(target=push_client, args=(port, info, seconds, lags)) for _ in range(clients)]
+
+    for thread in threads:
+        thread.start()
+    # Measure the server's CPU once every client is connected
+    time.sleep(1)
+    cpu_start, start = get_json(port, '/bench/info')['cpu'], time.time()
+    time.sleep(seconds - 2)
+    cpu = (get_json(port, '/bench/info')['cpu'] - cpu_start) / (time.time() - start)
+    for thread in threads:
+        thread.join()
+    server.terminate()
+    server.join()
+    return cpu, np.array(lags) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interval polling vs server push with many viewers")
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--events', type=int, default=20_000)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{args.clients} clients for {args.seconds:.0f} s, one stream event per 250 ms when active")
+    print(f"{'transport':10s} {'stream':7s} {'server CPU s/s':>15s} {'lag p50 ms':>11s} {'lag p99 ms':>11s}")
+    for scenario in ('idle', 'active'):
+        for mode in ('poll', 'push'):
+            cpu, lags = run(mode, scenario, args.clients, args.seconds, args.events, args.port)
+            p50, p99 = (np.percentile(lags, [50, 99]) if len(lags) else (np.nan, np.nan))
+            print(f"{mode:10s} {scenario:7s} {cpu:15.3f} {p50:11.1f} {p99:11.1f}")
+            args.port += 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.bench_features import synthetic_outages
+from generators.realtime_generator import OutageReplay
+from utils.event_bus import BLOCK, COALESCE, DROP_OLDEST, EventBus, start_consumer
+
+
+def slow(seconds):
+    """Handler taking `seconds` per event, like chart rendering."""
+    def handle(events):
+        time.sleep(seconds * (len(events) if isinstance(events, list) else 1))
+    return handle
+
+
+def run(df, subscribers, slow_seconds):
+    """
+    Pump the outages through a bus with the given (name, policy) subscribers
+    plus a fast blocking counter.
+
+    Returns:
+        tuple: (ingestion events/s, seconds until the consumers finished, subscriber stats)
+    """
+    bus = EventBus()
+    counted = []
+    threads = [start_consumer(bus.subscribe('counter', policy=BLOCK, batch_size=100), counted.append)]
+    for name, policy in subscribers:
+        options = {'key': lambda event: event['location']} if policy == COALESCE else {}
+        subscription = bus.subscribe(name, policy=policy, maxsize=1000, **options)
+        threads.append(start_consumer(subscription, slow(slow_seconds)))
+
+    start = time.perf_counter()
+    published = bus.pump(OutageReplay(df, batch_size=100))
+    ingest_seconds = time.perf_counter() - start
+    # Stats at the end of ingestion show how far behind each consumer was
+    stats = bus.stats()
+    for thread in threads:
+        thread.join()
+    return published / ingest_seconds, time.perf_counter() - start, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event bus ingestion with slow consumers")
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--slow-ms', type=float, default=1.0, help='Per-event time of the slow consumers')
+    args = parser.parse_args()
+
+    df = synthetic_outages(args.rows)
+    scenarios = [
+        ('no slow consumers', []),
+        ('slow drop-oldest + coalesce', [('chart', DROP_OLDEST), ('latest per village', COALESCE)]),
+        ('slow blocking consumer', [('chart', BLOCK)]),
+    ]
+    for title, subscribers in scenarios:
+        rate, seconds, stats = run(df, subscribers, args.slow_ms / 1000)
+        print(f"\n{title}: ingestion {rate:,.0f} events/s, consumers done after {seconds:.2f} s")
+        print(pd.DataFrame(stats).drop(columns=['published', 'depth']).to_string(index=False, float_format='%.3f'))
+
+
+if __name__ == "__main__":
+    main()
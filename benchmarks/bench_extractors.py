@@ -0,0 +1,64 @@
+import argparse
+import glob
+import os
+import time
+
+from generators.extractors import EXTRACTORS, extract_html_parser
+
+# Saved listing pages shared with tests/test_extractors.py
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'listing_pages')
+
+
+def load_fixtures(fixture_dir):
+    """Load saved listing pages (*.html) as raw bytes."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+        with open(path, 'rb') as file:
+            pages.append(file.read())
+    return pages
+
+
+def benchmark_extractors(pages, repeat=5):
+    """
+    Time every registered extractor over `pages`.
+
+    Returns:
+        dict: backend name -> (pages per second, number of pages whose output
+              differs from the reference html.parser extractor)
+    """
+    reference = [extract_html_parser(page) for page in pages]
+    results = {}
+
+    for name, extractor in EXTRACTORS.items():
+        mismatches = sum(1 for page, expected in zip(pages, reference) if extractor(page) != expected)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for page in pages:
+                extractor(page)
+        elapsed = time.perf_counter() - start
+
+        results[name] = (len(pages) * repeat / elapsed, mismatches)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML extractor backends")
+    parser.add_argument('--fixtures', default=FIXTURE_DIR,
+                        help='Directory of saved listing pages (*.html), e.g. the spider page cache')
+    parser.add_argument('--repeat', type=int, default=5, help='Passes over the fixture pages per backend')
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures)
+    if not pages:
+        print(f"No *.html fixtures found in {args.fixtures}.")
+        return
+
+    print(f"{len(pages)} pages, {args.repeat} passes")
+    for name, (pages_per_second, mismatches) in benchmark_extractors(pages, args.repeat).items():
+        print(f"{name:12s} {pages_per_second:8.1f} pages/s  mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
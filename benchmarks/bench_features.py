@@ -0,0 +1,90 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from modeling.features import CATEGORICAL_COLUMNS, FeatureEncoder, add_features
+
+WEEKDAYS = ['Maanantaina', 'Tiistaina', 'Keskiviikkona', 'Torstaina', 'Perjantaina', 'Lauantaina', 'Sunnuntaina']
+
+
+def synthetic_outages(size, locations=500, tags=300, seed=0):
+    """Processed outage records with `locations` villages and a `tags` word vocabulary."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"sana{i}" for i in range(tags - 2)] + ['huollosta', 'saneeraustöistä'], dtype=object)
+    tag_counts = rng.integers(0, 6, size)
+    tag_lists = np.split(rng.choice(vocabulary, tag_counts.sum()), np.cumsum(tag_counts)[:-1])
+
+    return pd.DataFrame({
+        'weekday': rng.choice(WEEKDAYS, size),
+        'day': rng.integers(1, 29, size),
+        'month': rng.integers(1, 13, size),
+        'year': rng.integers(2019, 2026, size),
+        'time_start': [f"{h:02d}.{m:02d}" for h, m in zip(rng.integers(0, 24, size), rng.choice([0, 15, 30, 45], size))],
+        'location': np.array([f"Kylä{i}" for i in range(locations)], dtype=object)[rng.integers(0, locations, size)],
+        'tags': [list(tags) for tags in tag_lists],
+        'latitude': rng.uniform(61.5, 64.5, size),
+        'longitude': rng.uniform(25, 30.5, size),
+        'lampotila_celsius': rng.normal(3, 10, size),
+    })
+
+
+def legacy_features(df):
+    """The previous encoding: row-wise lambdas and dense pd.get_dummies, tags one-hot as well."""
+    df = df.copy()
+    df['Is_Huolto'] = df['tags'].apply(lambda x: 1 if isinstance(x, list) and 'huollosta' in x else 0)
+    df['Is_Saneeraus'] = df['tags'].apply(lambda x: 1 if isinstance(x, list) and 'saneeraustöistä' in x else 0)
+    df['season'] = df['month'].apply(lambda m: 'Talvi' if m in [12,1,2] else 'Kevat' if m in [3,4,5] else 'Kesa' if m in [6,7,8] else 'Syksy')
+    tags = df.pop('tags').str.join('|').str.get_dummies().add_prefix('tag_')
+    df = pd.get_dummies(df.drop(columns=['time_start', 'day']), columns=CATEGORICAL_COLUMNS, drop_first=False)
+    return pd.concat([df, tags], axis=1).to_numpy(dtype=np.float32)
+
+
+def sparse_features(df):
+    return FeatureEncoder().fit_transform(add_features(df))
+
+
+def measure(function, df):
+    """
+    Run `function(df)` twice: once timed, once with tracemalloc (which slows
+    Python code down too much to time it).
+
+    Returns:
+        tuple: (result size in MB, peak traced memory in MB, seconds)
+    """
+    start = time.perf_counter()
+    function(df)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    X = function(df)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    size = X.nbytes if isinstance(X, np.ndarray) else X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return size / 1e6, peak / 1e6, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and time of dense vs sparse feature encoding")
+    parser.add_argument('--base', type=int, default=5000, help='Rows at 1x')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--legacy-max-rows', type=int, default=50_000, help='Skip the dense encoding above this size')
+    args = parser.parse_args()
+
+    print(f"{'rows':>9s} {'encoding':8s} {'matrix MB':>10s} {'peak MB':>9s} {'seconds':>8s}")
+    for scale in args.scales:
+        df = synthetic_outages(args.base * scale)
+        runs = [('sparse', sparse_features)]
+        if len(df) <= args.legacy_max_rows:
+            runs.insert(0, ('dense', legacy_features))
+
+        for name, function in runs:
+            size, peak, seconds = measure(function, df)
+            print(f"{len(df):9d} {name:8s} {size:10.1f} {peak:9.1f} {seconds:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import threading
+import time
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+from api.fmi_client import FMIClient
+from api.weather import MULTIPOINT_QUERY, SERVICE_AREA_BBOX, enrich_with_weather, observation_window_args
+
+STATIONS = [
+    (101570, 'Kuopio Savilahti', 62.89, 27.63),
+    (101580, 'Iisalmi Runni', 63.52, 27.19),
+    (101421, 'Varkaus Kosulanniemi', 62.32, 27.92),
+    (101632, 'Joensuu Linnunlahti', 62.60, 29.74),
+    (101537, 'Mikkeli lentoasema', 61.69, 27.21),
+]
+
+CANNED_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" xmlns:gml="http://www.opengis.net/gml/3.2"
+    xmlns:gmlcov="http://www.opengis.net/gmlcov/1.0" xmlns:swe="http://www.opengis.net/swe/2.0">
+  <wfs:member>
+{points}
+    <gmlcov:positions>{positions}</gmlcov:positions>
+    <gml:doubleOrNilReasonTupleList>{values}</gml:doubleOrNilReasonTupleList>
+    <swe:DataRecord>
+      <swe:field name="t2m"><swe:label>Air temperature</swe:label><swe:uom code="degC"/></swe:field>
+    </swe:DataRecord>
+  </wfs:member>
+</wfs:FeatureCollection>
+"""
+
+
+def canned_multipoint_xml(start, end):
+    """Multipointcoverage XML with an hourly temperature of every stub station between `start` and `end`."""
+    times = pd.date_range(pd.Timestamp(start).ceil('h'), end, freq='h')
+    epochs = (times - pd.Timestamp('1970-01-01')) // pd.Timedelta(seconds=1)
+
+    points, positions, values = [], [], []
+    for fmisid, name, lat, lon in STATIONS:
+        points.append(f'    <gml:Point gml:id="point-{fmisid}"><gml:name>{name}</gml:name>'
+                      f'<gml:pos>{lat} {lon} </gml:pos></gml:Point>')
+        for time_stamp, epoch in zip(times, epochs):
+            positions.append(f"{lat} {lon} {epoch}")
+            # Every fifth hour of the first station is missing
+            missing = fmisid == STATIONS[0][0] and time_stamp.hour % 5 == 0
+            values.append('NaN' if missing else f"{np.sin(epoch / 86400) * 10 + lat - 60:.1f}")
+
+    return CANNED_TEMPLATE.format(points='\n'.join(points), positions='\n'.join(positions), values='\n'.join(values))
+
+
+def start_stub(latency, fail_first=0, fail_status=503):
+    """
+    Serve canned WFS answers on a local port in a background thread.
+    The first `fail_first` requests of every URL get `fail_status`. The
+    server runs until the benchmark exits; the tests use the wfs_stub
+    fixture of tests/conftest.py, which shuts its stubs down.
+
+    Returns:
+        tuple: (base url, request counter dict)
+    """
+    counter = {'requests': 0, 'failed': 0}
+    seen = {}
+
+    async def handle(request):
+        counter['requests'] += 1
+        await asyncio.sleep(latency)
+        seen[request.path_qs] = seen.get(request.path_qs, 0) + 1
+        if seen[request.path_qs] <= fail_first:
+            counter['failed'] += 1
+            return web.Response(status=fail_status)
+
+        query = parse_qs(request.query_string)
+        xml = canned_multipoint_xml(
+            pd.Timestamp(query['starttime'][0]).tz_localize(None),
+            pd.Timestamp(query['endtime'][0]).tz_localize(None),
+        )
+        return web.Response(text=xml, content_type='text/xml')
+
+    ready = threading.Event()
+    address = {}
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get('/wfs', handle)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        loop.run_until_complete(site.start())
+        address['port'] = runner.addresses[0][1]
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    base_url = f"http://127.0.0.1:{address['port']}/wfs?service=WFS&version=2.0.0&request=getFeature&storedquery_id="
+    return base_url, counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise the async FMI client against a local WFS stub")
+    parser.add_argument('--days', type=int, default=40, help='Number of day windows to fetch')
+    parser.add_argument('--latency', type=float, default=0.1, help='Stub response delay in seconds')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once')
+    args = parser.parse_args()
+
+    days = pd.date_range('2024-01-01', periods=args.days, freq='D')
+    calls = [(MULTIPOINT_QUERY, observation_window_args(day, day + pd.Timedelta(hours=23), SERVICE_AREA_BBOX))
+             for day in days]
+
+    for concurrency in (1, args.concurrency):
+        # A fresh stub per run, so both runs see the same failures
+        base_url, counter = start_stub(args.latency, fail_first=1)
+        client = FMIClient(base_url=base_url, max_concurrency=concurrency, backoff=0.01)
+        start = time.perf_counter()
+        results = client.query_many(calls)
+        seconds = time.perf_counter() - start
+        failed = sum(isinstance(result, Exception) for result in results)
+        print(f"concurrency={concurrency:<3d} {seconds:6.2f} s  failed: {failed}  {client.stats}")
+
+    # The same windows asked many times at once are requested only once each
+    client = FMIClient(base_url=base_url, max_concurrency=args.concurrency)
+    before = counter['requests']
+    client.query_many(calls[:5] * 10)
+    print(f"50 queries for 5 windows -> {counter['requests'] - before} requests  {client.stats}")
+
+    # Bulk enrichment through the client
+    rng = np.random.default_rng(0)
+    outages = pd.DataFrame({
+        'latitude': rng.uniform(61.8, 63.5, 500),
+        'longitude': rng.uniform(26.5, 29.5, 500),
+        'start_timestamp': days[0] + pd.to_timedelta(rng.integers(0, args.days * 24, 500), unit='h'),
+    })
+    enriched = enrich_with_weather(outages, query=FMIClient(base_url=base_url, max_concurrency=args.concurrency))
+    print(f"enriched rows with temperature: {enriched['lampotila_celsius'].notna().sum()}/{len(enriched)}")
+
+
+if __name__ == "__main__":
+    main()
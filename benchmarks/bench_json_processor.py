@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import io
+import random
+import re
+import time
+
+from processors.json_processor import canonical_cities, get_parser
+
+
+def legacy_process_data(entry, canonical_cities, last_valid_year, last_valid_month):
+    """Copy of process_data before the patterns were precompiled, used as the baseline."""
+    WHITESPACE = r"[\s\xa0]"
+    FINAL_PATTERN = (
+        rf"(?i).*?"
+        rf"(?:tänään{WHITESPACE}+)?"
+        rf"(maanantaina|tiistaina|keskiviikkona|torstaina|perjantaina|lauantaina|sunnuntaina){WHITESPACE}*"
+        rf"(\d{{1,2}})\.(\d{{1,2}})(?:\.(\d{{4}}))?"
+        rf"{WHITESPACE}*\.?"
+        rf"(?:"
+        rf"{WHITESPACE}*"
+        rf"(?:kello|klo){WHITESPACE}*"
+        rf"(\d{{1,2}}(?:[:\.]\d{{2}})?)?"
+        rf"[–-]*"
+        rf"(\d{{1,2}}(?:[:\.]\d{{2}})?)?"
+        rf")?"
+        rf"{WHITESPACE}*(.*)"
+    )
+    match = re.search(FINAL_PATTERN, entry)
+    if not match:
+        return None, last_valid_year, last_valid_month
+
+    month = match.group(3)
+    year = match.group(4) if match.group(4) else "Unknown"
+    message = match.group(7).strip()
+    prefixes = ["kauko", "huol", "jake", "saneer", "lämmö", "kesk", "vahin", "kaiv", "sähk", "vaurio", "korj", "per"]
+    tags = re.findall(r'\b((?:' + '|'.join(prefixes) + r')\w*)\b', message, re.IGNORECASE)
+
+    if year != "Unknown":
+        last_valid_year = year
+        final_year_output = year
+        last_valid_month = month
+    elif last_valid_year and int(month) > int(last_valid_month):
+        print(f"m: {month} lvm: {last_valid_month}")
+        final_year_output = f"{int(last_valid_year)-1} (Puuttuva vuosi generoitu ympärillä olevasta datasta)"
+    elif last_valid_year:
+        final_year_output = f"{last_valid_year} (Puuttuva vuosi generoitu ympärillä olevasta datasta)"
+    else:
+        final_year_output = "2025"
+
+    location = None
+    entry_words = re.findall(r'\b[a-zåäö]{3,}\b', entry.lower())
+    for city in sorted(canonical_cities, key=len, reverse=True):
+        city_lower = city.lower()
+        match_len = min(5, len(city_lower))
+        for word in entry_words:
+            if word[:match_len] == city_lower[:match_len]:
+                location = city
+                break
+        if location:
+            break
+
+    return {
+        'weekday': match.group(1),
+        'day': match.group(2),
+        'month': month,
+        'year': final_year_output,
+        'time_start': match.group(5),
+        'time_end': match.group(6) if match.group(6) else "Unknown",
+        'tags': tags,
+        'location': location,
+    }, last_valid_year, last_valid_month
+
+
+WEEKDAYS = ["Maanantaina", "Tiistaina", "Keskiviikkona", "Torstaina", "Perjantaina", "Lauantaina", "Sunnuntaina"]
+CAUSES = ["huoltotöiden", "saneeraustöiden", "kaivuutöiden", "vauriokorjauksen", "keskeytys", "sähkönjakelussa"]
+
+
+def synthetic_corpus(size, seed=42):
+    """Generate `size` notices shaped like the scraped ones, a fifth of them without a year."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        date = f"{rng.randint(1, 28)}.{rng.randint(1, 12)}"
+        if rng.random() > 0.2:
+            date += f".{rng.randint(2021, 2025)}"
+        start = rng.randint(6, 15)
+        corpus.append(
+            f"Tänään {rng.choice(WEEKDAYS)} {date} klo {start}.00–{start + rng.randint(1, 6)} "
+            f"{rng.choice(canonical_cities)}n alueella {rng.choice(CAUSES)} vuoksi "
+            f"{rng.choice(CAUSES)} tiedote"
+        )
+    return corpus
+
+
+SYLLABLES = ["ka", "lo", "ti", "va", "mä", "ri", "jo", "su", "ne", "hä", "pe", "kul", "tam", "mi", "ran", "ta",
+             "sal", "vuo", "ret", "kä", "nie", "mel", "lah", "jär", "ven", "sii", "kos", "pol", "tö", "ku"]
+SUFFIXES = ["", "n", "lla", "ssa", "sta", "lle", "kin", "katu", "tie", "polku", "nkatu", "ntie"]
+
+
+def realistic_corpus(size, seed=42, words=15, vocabulary=50_000):
+    """
+    Generate `size` notices with `words` free-text words each, drawn from a
+    `vocabulary` of street, village and customer words like the live notices,
+    so most words of a notice have not been seen in the previous ones.
+    """
+    rng = random.Random(seed)
+    stems = set()
+    while len(stems) < vocabulary:
+        stems.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    stems = sorted(stems)
+    corpus = []
+    for _ in range(size):
+        date = f"{rng.randint(1, 28)}.{rng.randint(1, 12)}"
+        if rng.random() > 0.2:
+            date += f".{rng.randint(2021, 2025)}"
+        start = rng.randint(6, 15)
+        free_text = ' '.join(
+            rng.choice(stems).capitalize() + rng.choice(SUFFIXES) + (f" {rng.randint(1, 120)}," if rng.random() < 0.3 else '')
+            for _ in range(words)
+        )
+        corpus.append(
+            f"Tänään {rng.choice(WEEKDAYS)} {date} klo {start}.00–{start + rng.randint(1, 6)} "
+            f"{rng.choice(canonical_cities)}n alueella {free_text} {rng.choice(CAUSES)} vuoksi"
+        )
+    return corpus
+
+
+def run(process, corpus):
+    """Process the corpus like raw_processor and return (results, entries per second)."""
+    last_valid_year, last_valid_month = None, 12
+    results = []
+    start = time.perf_counter()
+    # The year inference prints a line per imputed entry, keep it off the terminal
+    with contextlib.redirect_stdout(io.StringIO()):
+        for entry in corpus:
+            processed, last_valid_year, last_valid_month = process(entry, last_valid_year, last_valid_month)
+            results.append(processed)
+    return results, len(corpus) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the notice parser against the legacy process_data")
+    parser.add_argument('--size', type=int, default=100_000, help='Number of synthetic notices')
+    parser.add_argument('--vocabulary', choices=['small', 'realistic'], default='realistic',
+                        help='small: the few words of synthetic_corpus; realistic: ~15 unseen free-text words per notice')
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.size) if args.vocabulary == 'small' else realistic_corpus(args.size)
+    notice_parser = get_parser(canonical_cities)
+
+    legacy, legacy_rate = run(lambda e, y, m: legacy_process_data(e, canonical_cities, y, m), corpus)
+    compiled, compiled_rate = run(notice_parser.parse, corpus)
+
+    print(f"legacy    {legacy_rate:10.0f} entries/s")
+    print(f"compiled  {compiled_rate:10.0f} entries/s  ({compiled_rate / legacy_rate:.1f}x)")
+    print(f"identical output: {legacy == compiled}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+
+from benchmarks.bench_json_processor import synthetic_corpus
+from processors.json_processor import canonical_cities, raw_processor, raw_processor_parallel
+
+
+def timed(function, *args, **kwargs):
+    """Run `function` with stdout captured and return (result, printed output, seconds)."""
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        result = function(*args, **kwargs)
+    return result, output.getvalue(), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and parallel raw_processor output and speed")
+    parser.add_argument('--size', type=int, default=100_000, help='Number of synthetic notices')
+    parser.add_argument('--workers', type=int, default=None, help='Process pool size (default: all cores)')
+    parser.add_argument('--trials', type=int, default=5, help='Random chunk sizes to check')
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.size)
+    # Entries that do not parse must be dropped in the same places
+    corpus[::97] = ["Jär"] * len(corpus[::97])
+
+    serial, serial_output, serial_time = timed(raw_processor, corpus, canonical_cities)
+    expected = json.dumps(serial, ensure_ascii=False, indent=4)
+    print(f"serial            {serial_time:6.2f} s")
+
+    # Chunk boundaries at random places, including tiny chunks that split every run of missing years
+    rng = random.Random(0)
+    chunk_sizes = [1, 7] + [rng.randint(2, max(3, args.size // 4)) for _ in range(args.trials)]
+
+    for chunk_size in chunk_sizes:
+        if chunk_size == 1 and args.size > 10_000:
+            continue  # One entry per task is only worth checking on small inputs
+        parallel, parallel_output, parallel_time = timed(
+            raw_processor_parallel, corpus, canonical_cities, workers=args.workers, chunk_size=chunk_size
+        )
+        identical = json.dumps(parallel, ensure_ascii=False, indent=4) == expected and parallel_output == serial_output
+        print(f"chunk_size={chunk_size:<7d} {parallel_time:6.2f} s  identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
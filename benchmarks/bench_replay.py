@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_features import synthetic_outages
+from generators.realtime_generator import OutageReplay
+
+
+def legacy_stream(df):
+    """The previous outage_stream without its sleep: a Series per row."""
+    for _, row in df.iterrows():
+        yield row.to_dict()
+
+
+def with_start_times(df, days=365, seed=0):
+    """Outages with start timestamps spread over `days` days."""
+    rng = np.random.default_rng(seed)
+    df = df.copy()
+    df['start_dt'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, days * 86400, len(df))), unit='s')
+    return df
+
+
+def throughput(stream):
+    start = time.perf_counter()
+    events = 0
+    for item in stream:
+        events += len(item) if isinstance(item, list) else 1
+    return events / (time.perf_counter() - start)
+
+
+def paced(replay):
+    """
+    Replay at event time and record how late every outage was delivered.
+
+    Returns:
+        tuple: (events per second, p50 and p99 lateness in ms)
+    """
+    start = time.perf_counter()
+    late = []
+    for item in replay:
+        elapsed = time.perf_counter() - start
+        items = item if isinstance(item, list) else [item]
+        late.extend([elapsed] * len(items))
+    late = (np.array(late) - replay.offsets) * 1000
+    return len(late) / (time.perf_counter() - start), np.percentile(late, 50), np.percentile(late, 99)
+
+
+async def consume(replay, counts, name):
+    async for item in replay:
+        counts[name] = counts.get(name, 0) + (len(item) if isinstance(item, list) else 1)
+
+
+async def concurrent_consumers(replays):
+    counts = {}
+    await asyncio.gather(*(consume(replay, counts, i) for i, replay in enumerate(replays)))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outage replay throughput and pacing")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--rate', type=float, default=5000, help='Target events per second of the paced replay')
+    parser.add_argument('--seconds', type=float, default=5, help='Length of the paced replay')
+    args = parser.parse_args()
+
+    df = with_start_times(synthetic_outages(args.rows))
+    legacy_rows = min(args.rows, 20_000)
+
+    print(f"{'stream':28s} {'events/s':>12s}")
+    print(f"{'iterrows (legacy)':28s} {throughput(legacy_stream(df.head(legacy_rows))):12,.0f}")
+    for record_type in ('dict', 'tuple'):
+        for batch_size in (1, 100):
+            rate = throughput(OutageReplay(df, batch_size=batch_size, record_type=record_type))
+            print(f"{f'replay {record_type} batch {batch_size}':28s} {rate:12,.0f}")
+
+    # Event-time replay: choose the speed-up that gives the target rate on average
+    rows = int(args.rate * args.seconds)
+    sample = df.head(rows)
+    span = (sample['start_dt'].iloc[-1] - sample['start_dt'].iloc[0]).total_seconds()
+    print(f"\nEvent-time replay of {rows} outages at x{span / args.seconds:,.0f} (target {args.rate:,.0f}/s)")
+    print(f"{'batch':>5s} {'events/s':>10s} {'late p50 ms':>12s} {'late p99 ms':>12s}")
+    for batch_size in (1, 100):
+        rate, p50, p99 = paced(OutageReplay(sample, speedup=span / args.seconds, batch_size=batch_size))
+        print(f"{batch_size:5d} {rate:10,.0f} {p50:12.2f} {p99:12.2f}")
+
+    replays = [OutageReplay(sample, speedup=span / args.seconds, batch_size=100) for _ in range(2)]
+    start = time.perf_counter()
+    counts = asyncio.run(concurrent_consumers(replays))
+    print(f"\nTwo async consumers in one loop: {counts} events in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
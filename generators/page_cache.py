@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = 'data/cache/pages'
+
+# Eviction limits: total size of cached bodies and age of an entry
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+MAX_CACHE_AGE = 30 * 24 * 3600
+
+
+class PageCache:
+    """
+    On-disk HTTP response cache keyed by URL.
+
+    Every entry is a pair of files named after the SHA-1 of the URL: `<key>.html`
+    holds the response body and `<key>.json` the ETag / Last-Modified headers,
+    the fetch time and the notices parsed from the body. A 304 answer can then
+    be served from the stored notices without parsing the page again.
+
+    With `offline=True` no requests are made at all and pages are replayed
+    from the cached HTML.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, max_age=MAX_CACHE_AGE, offline=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.offline = offline
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.html'
+
+    def get(self, url):
+        """Return the cached metadata for `url`, or None if it is not cached."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if not os.path.exists(body_path):
+            return None
+        return meta
+
+    def get_body(self, url):
+        """Return the cached response body for `url` as bytes, or None."""
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def conditional_headers(self, url):
+        """Return If-None-Match / If-Modified-Since headers for a cached `url`."""
+        meta = self.get(url)
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, response, notices):
+        """Save the body, validators and parsed notices of a 200 response."""
+        meta_path, body_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'notices': notices,
+        }
+
+        # Write to temporary files first so concurrent readers never see half an entry
+        with open(body_path + '.tmp', 'wb') as file:
+            file.write(response.content)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False)
+        os.replace(body_path + '.tmp', body_path)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def touch(self, url):
+        """Mark a cached entry as fresh after the server answered 304 Not Modified."""
+        meta = self.get(url)
+        if meta is None:
+            return
+        meta['fetched_at'] = time.time()
+        meta_path, _ = self._paths(url)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(meta, file, ensure_ascii=False)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def evict(self):
+        """
+        Drop entries older than `max_age`, then the least recently fetched
+        entries until the cached bodies fit in `max_bytes`.
+
+        Returns:
+            int: Number of evicted entries.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            body_path = meta_path[:-len('.json')] + '.html'
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as file:
+                    fetched_at = json.load(file).get('fetched_at', 0)
+                size = os.path.getsize(body_path)
+            except (OSError, json.JSONDecodeError):
+                fetched_at, size = 0, 0
+            entries.append((fetched_at, size, meta_path, body_path))
+
+        # Oldest first
+        entries.sort()
+        now = time.time()
+        total = sum(entry[1] for entry in entries)
+        evicted = 0
+
+        for fetched_at, size, meta_path, body_path in entries:
+            if now - fetched_at <= self.max_age and total <= self.max_bytes:
+                break
+            for path in (meta_path, body_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            total -= size
+            evicted += 1
+
+        if evicted:
+            print(f"Evicted {evicted} cached pages")
+        return evicted
@@ -1,9 +1,114 @@
-import json
-import pandas as pd
+import asyncio
 import time
+import numpy as np
+import pandas as pd
+
+from utils.durations import add_duration_columns
+
+
+class OutageReplay:
+    """
+    Replay of processed outages as a stream, iterable synchronously
+    (`for outage in replay`) or asynchronously (`async for outage in replay`).
+    Every iteration is an independent replay with its own clock, so several
+    consumers can replay the same outages, e.g. as tasks of one event loop.
+
+    Pacing:
+        speedup: replay at the outages' actual start times, `speedup` times
+                 faster (3600: one hour of outages per second). Outages
+                 without a valid start time are left out.
+        delay:   otherwise, a fixed delay in seconds between outages.
+        Neither: as fast as the consumer reads.
+
+    Records are built from per-column lists, not one Series per row.
+
+    Args:
+        df (pd.DataFrame): Processed outages.
+        batch_size (int): If > 1, yield lists of the outages that are due,
+                          at most `batch_size` at a time, instead of one
+                          outage per step; an outage is never held back to fill a batch.
+        record_type (str): 'dict' or 'tuple' (values in the order of `columns`).
+        time_column (str): Column with the start timestamps; derived from the
+                           day and clock columns if missing.
+    """
+
+    def __init__(self, df, speedup=None, delay=0.0, batch_size=1, record_type='dict', time_column='start_dt'):
+        if record_type not in ('dict', 'tuple'):
+            raise ValueError(f"Unknown record type: {record_type}")
+        self.batch_size = max(1, int(batch_size))
+        self.record_type = record_type
+        self.skipped = 0
+
+        if speedup:
+            times = pd.to_datetime(df[time_column]) if time_column in df.columns else add_duration_columns(df)['start_dt']
+            valid = times.notna().to_numpy()
+            self.skipped = int((~valid).sum())
+            df, times = df[valid], times[valid]
+            order = np.argsort(times.to_numpy(), kind='stable')
+            df = df.iloc[order]
+            times = times.to_numpy()[order]
+            # Seconds from the start of the replay at which every outage is due
+            self.offsets = (times - times[0]) / np.timedelta64(1, 's') / speedup if len(times) else np.array([])
+        elif delay:
+            self.offsets = np.arange(len(df)) * float(delay)
+        else:
+            self.offsets = None
+
+        self.columns = list(df.columns)
+        # tolist() gives native Python values, like row.to_dict() did
+        self.values = [df[col].tolist() for col in self.columns]
+
+    def __len__(self):
+        return len(self.values[0]) if self.values else 0
+
+    def _next_stop(self, position, elapsed):
+        """
+        End of the next slice of due outages starting at `position`, given the
+        seconds `elapsed` since the replay started.
+
+        Returns:
+            tuple: (stop, 0) or (None, seconds to wait until the next outage is due).
+        """
+        stop = min(position + self.batch_size, len(self))
+        if self.offsets is None:
+            return stop, 0
+        due = self.offsets[position]
+        if due > elapsed:
+            return None, due - elapsed
+        return min(stop, int(np.searchsorted(self.offsets, elapsed, side='right'))), 0
+
+    def _emit(self, start, stop):
+        rows = zip(*(values[start:stop] for values in self.values))
+        if self.record_type == 'dict':
+            rows = (dict(zip(self.columns, row)) for row in rows)
+        if self.batch_size == 1:
+            return next(rows)
+        return list(rows)
+
+    def __iter__(self):
+        start, position = time.perf_counter(), 0
+        while position < len(self):
+            stop, wait = self._next_stop(position, time.perf_counter() - start)
+            if stop is None:
+                time.sleep(wait)
+                continue
+            yield self._emit(position, stop)
+            position = stop
+
+    async def __aiter__(self):
+        start, position = time.perf_counter(), 0
+        while position < len(self):
+            stop, wait = self._next_stop(position, time.perf_counter() - start)
+            if stop is None:
+                await asyncio.sleep(wait)
+                continue
+            yield self._emit(position, stop)
+            position = stop
+            if self.offsets is None:
+                # Unpaced: still let the other consumers of the loop run
+                await asyncio.sleep(0)
+
 
 def outage_stream(df, delay=0.1):
     """Yield one outage at a time with a delay"""
-    for _, row in df.iterrows():
-        yield row.to_dict()
-        time.sleep(delay)
\ No newline at end of file
+    yield from OutageReplay(df, delay=delay)
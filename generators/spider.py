@@ -1,51 +1,283 @@
 import requests
-from bs4 import BeautifulSoup
-from utils.file_utils import save_to_json
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from generators.extractors import get_extractor
+from utils.file_utils import save_to_json, read_records, save_records
+import hashlib
+import json
+import threading
 import time
 import random
 
+BASE_URL = "https://savonvoima.fi"
+PAGE_PATH = "/kategoria/hairiot/page/{page_number}/"
+
+# Pages 2-89 hold the outage archive
+FIRST_PAGE = 2
+LAST_PAGE = 89
+
+# Raw store and the sidecar files written by the incremental crawl (defaults;
+# main.py passes the raw store and new entries in the chosen --format)
+RAW_PATH = 'data/raw/outages/outage_data.json'
+INDEX_PATH = 'data/raw/outages/outage_index.json'
+NEW_ENTRIES_PATH = 'data/raw/outages/new_entries.json'
+
+# HTTP statuses that mean the server wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to keep the concurrent crawl polite.
+
+    Tokens refill at `rate` per second up to `capacity`. When the server
+    answers with a throttling status the rate is halved (down to `min_rate`),
+    and every successful response nudges it back towards the original rate.
+    """
+
+    def __init__(self, rate=1.0, capacity=2, min_rate=0.1):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available and consume it."""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self):
+        """Halve the refill rate after a throttling response."""
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def reward(self):
+        """Recover the refill rate slowly after a successful response."""
+        with self.lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
+
+def create_session(pool_size=4):
+    """Create a keep-alive requests.Session with a connection pool of `pool_size`."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def page_url(page_number, base_url=BASE_URL):
+    """Return the URL of a single outage listing page."""
+    return base_url.rstrip("/") + PAGE_PATH.format(page_number=page_number)
+
+
+def parse_outage_page(content, page_number, backend=None):
+    """Extract the outage notices from the HTML of one listing page."""
+    outage_data = get_extractor(backend)(content)
+
+    # Print the data to check if it's being extracted
+    print(f"Page {page_number} data: {outage_data}")
+
+    return outage_data
+
+
 # Function to extract outage data from a single page
-def extract_outage_data(page_number):
+def extract_outage_data(page_number, session=None, base_url=BASE_URL, rate_limiter=None, cache=None):
     # Construct the URL of the page
-    url = f"https://savonvoima.fi/kategoria/hairiot/page/{page_number}/"
-    
-    # Send a GET request to the page
-    response = requests.get(url)
-    
+    url = page_url(page_number, base_url)
+
+    # Offline replay: parse the cached HTML without touching the network
+    if cache and cache.offline:
+        body = cache.get_body(url)
+        if body is None:
+            print(f"Page {page_number} not in cache")
+            return []
+        return parse_outage_page(body, page_number)
+
+    if rate_limiter:
+        rate_limiter.acquire()
+
+    # Send a (conditional) GET request to the page, pooled if a session is given
+    headers = cache.conditional_headers(url) if cache else {}
+    response = (session or requests).get(url, headers=headers, timeout=30)
+
+    # Not modified: reuse the notices parsed on the previous fetch
+    if response.status_code == 304 and cache:
+        meta = cache.get(url)
+        if meta is not None:
+            if rate_limiter:
+                rate_limiter.reward()
+            cache.touch(url)
+            print(f"Page {page_number} not modified")
+            return meta['notices']
+
     # If the request is successful
     if response.status_code == 200:
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Find all div blocks with the class 'uutisnosto-sisalto sisennys'
-        divs = soup.find_all('div', class_='uutisnosto-sisalto sisennys')
-        
-        outage_data = []
-        
-        # Loop through each div and extract the first <p> tag
-        for div in divs:
-            # Find the first <p> tag inside the div
-            p_tag = div.find('p')
-            
-            if p_tag:
-                # Extract the date, time, and additional information
-                date_time_info = p_tag.text.strip()
-                outage_data.append(date_time_info)
-                        # Print the data to check if it's being extracted
-                print(f"Page {page_number} data: {outage_data}")
-        
+        if rate_limiter:
+            rate_limiter.reward()
+        outage_data = parse_outage_page(response.content, page_number)
+        if cache:
+            cache.store(url, response, outage_data)
         return outage_data
     else:
+        if rate_limiter and response.status_code in THROTTLE_STATUSES:
+            rate_limiter.penalize()
         print(f"Failed to retrieve page {page_number}")
         return []
 
+
+def scrape_outage_data_concurrent(first_page=FIRST_PAGE, last_page=LAST_PAGE, workers=4,
+                                  rate=2.0, base_url=BASE_URL, session=None, cache=None):
+    """
+    Scrape the listing pages with a pool of `workers` threads.
+
+    All requests share one pooled session and one token bucket, so at most
+    `rate` pages per second are requested on average. Each worker parses its
+    page right after downloading it, overlapping parsing with the other
+    downloads. The notices are returned in page order, because raw_processor
+    infers missing years from the surrounding entries.
+    """
+    session = session or create_session(pool_size=workers)
+    rate_limiter = TokenBucket(rate=rate, capacity=workers)
+    pages = range(first_page, last_page + 1)
+
+    def fetch(page_number):
+        try:
+            return extract_outage_data(page_number, session, base_url, rate_limiter, cache)
+        except requests.RequestException as e:
+            print(f"Failed to retrieve page {page_number}: {e}")
+            return []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # executor.map yields results in submission order, i.e. page order
+        results = executor.map(fetch, pages)
+
+        all_outages = []
+        for outages_on_page in results:
+            all_outages.extend(outages_on_page)
+
+    if cache and not cache.offline:
+        cache.evict()
+
+    return all_outages
+
+
 # Scrape pages from 2 to 89
-def scrape_outage_data():
+def scrape_outage_data(workers=1, rate=2.0, base_url=BASE_URL, cache=None):
+    if workers > 1:
+        return scrape_outage_data_concurrent(workers=workers, rate=rate, base_url=base_url, cache=cache)
+
+    offline = cache is not None and cache.offline
     all_outages = []
-    for page_number in range(2, 90):
+    session = create_session(pool_size=1)
+    for page_number in range(FIRST_PAGE, LAST_PAGE + 1):
         print(f"Scraping page {page_number}...")
-        outages_on_page = extract_outage_data(page_number)
+        outages_on_page = extract_outage_data(page_number, session, base_url, cache=cache)
         all_outages.extend(outages_on_page)
-        time.sleep(random.uniform(1, 3))  # Delay between 1 and 3 seconds    
+        if not offline:
+            time.sleep(random.uniform(1, 3))  # Delay between 1 and 3 seconds
+
+    if cache and not offline:
+        cache.evict()
+
+    return all_outages
+
+
+def notice_hash(notice):
+    """Return a content hash of a notice, ignoring surrounding and repeated whitespace."""
+    normalized = ' '.join(notice.split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def load_notice_index(raw_data, index_path=INDEX_PATH):
+    """
+    Load the content-hash index of the raw store.
+
+    The index is rebuilt from `raw_data` if the sidecar file is missing or
+    does not match the number of stored notices.
+    """
+    try:
+        with open(index_path, 'r', encoding='utf-8') as file:
+            hashes = json.load(file)
+        if len(hashes) == len(raw_data):
+            return set(hashes)
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    return {notice_hash(notice) for notice in raw_data}
+
+
+def scrape_incremental(raw_path=RAW_PATH, index_path=INDEX_PATH, base_url=BASE_URL, session=None, cache=None):
+    """
+    Fetch only the notices published since the last crawl.
+
+    Pages are walked newest-first and the crawl stops at the first page whose
+    notices are all already in the raw store. New notices are merged in front
+    of the stored ones, keeping the newest-first order of a full crawl.
+
+    Returns:
+        tuple: (merged raw data, list of new notices in page order)
+    """
+    try:
+        raw_data = list(read_records(raw_path))
+    except FileNotFoundError:
+        raw_data = []
+
+    known = load_notice_index(raw_data, index_path)
+    session = session or create_session(pool_size=1)
+
+    new_notices = []
+    for page_number in range(FIRST_PAGE, LAST_PAGE + 1):
+        print(f"Scraping page {page_number}...")
+        outages_on_page = extract_outage_data(page_number, session, base_url, cache=cache)
+
+        # An empty page means we ran past the archive or the request failed
+        if not outages_on_page:
+            break
+
+        fresh = []
+        for notice in outages_on_page:
+            digest = notice_hash(notice)
+            if digest not in known:
+                known.add(digest)
+                fresh.append(notice)
+
+        if not fresh:
+            break
+
+        new_notices.extend(fresh)
+        if not (cache and cache.offline):
+            time.sleep(random.uniform(1, 3))  # Delay between 1 and 3 seconds
+
+    merged = new_notices + raw_data
+    print(f"Incremental crawl: {len(new_notices)} new notices, {len(merged)} total")
+
+    return merged, new_notices
 
 
-    return all_outages
\ No newline at end of file
+def save_incremental(merged, new_notices, raw_path=RAW_PATH, index_path=INDEX_PATH,
+                     new_entries_path=NEW_ENTRIES_PATH):
+    """
+    Save the merged raw store, its hash index and the list of new entries for
+    downstream stages; the raw store and new entries in the format given by
+    their file extensions.
+    """
+    save_records(merged, raw_path)
+    save_to_json([notice_hash(notice) for notice in merged], index_path)
+    save_records(new_notices, new_entries_path)
@@ -1,19 +1,53 @@
 import argparse
 import json
+import os
 import numpy as np
 import pandas as pd
 from api.weather import weatherApi
-from generators.spider import scrape_outage_data
-from utils.file_utils import save_to_json
-from processors.json_processor import raw_processor, save_to_interim_json
+from api.observation_cache import ObservationCache
+from api.fmi_client import FMIClient
+from generators.spider import scrape_outage_data, scrape_incremental, save_incremental
+from generators.page_cache import PageCache
+from generators.extractors import set_default_backend
+from utils.file_utils import save_to_json, read_records, save_records, tee_records, write_jsonl
+from processors.json_processor import iter_raw_processor, raw_processor_parallel
 from processors.json_day_processor import find_weekday, extract_all, rejected_entries
 from analysis.word_frequency import get_field_word_frequency
 from processors.raw_json_processor import raw_processor1
-from processors.json_interim_processor import filter_data
+from processors.json_interim_processor import iter_filter_data
+from processors.columnar_processor import PARQUET_PATH, save_to_parquet, load_processed, is_current
+from utils.pipeline import Stage, Pipeline
 from analysis.temporal_analysis import monthly_duration , plot_monthly_duration_line
 from  analysis.geograpgical_analysis import location_frequency, plot_location_bar_chart
 from analysis.cause_location import plot_cause_by_location, analyze_cause_by_location
-from generators.realtime_generator import outage_stream
+from generators.realtime_generator import OutageReplay, outage_stream
+from modeling.outage_duration_ml import MODEL_PATH, load_training_data, train, predict_batch
+from modeling.model_search import search, best_candidate
+from modeling.online_model import ONLINE_MODEL_PATH, PREQUENTIAL_PATH, OnlineDurationModel, run_online
+from utils.durations import add_duration_columns
+from utils.event_bus import BLOCK, DROP_OLDEST, EventBus, start_consumer, start_reader
+
+# Dataset paths without extension; the extension selects the storage format
+# (json = pretty-printed list, jsonl / jsonl.gz / jsonl.zst = JSON Lines)
+RAW_DATA = 'data/raw/outages/outage_data'
+NEW_ENTRIES_DATA = 'data/raw/outages/new_entries'
+INTERIM_DATA = 'data/interim/outage_data'
+PROCESSED_DATA = 'data/processed/outage_data'
+PREDICTIONS_PATH = 'reports/predicted_durations.csv'
+# Seconds the stream waits for a stalled --sink before dropping an outage
+SINK_BLOCK_TIMEOUT = 5.0
+
+# List of canonical cities
+canonical_cities = [
+    "Iisalmi", "Joensuu", "Joroinen", "Juankoski", "Karttula", "Keitele", 
+    "Kiuruvesi", "Lapinlahti", "Leppävirta", "Maaninka", "Nilsiä", "Pieksämäki", 
+    "Pielavesi", "Rautalampi", "Siilinjärvi", "Suonenjoki", "Tahkovuori", 
+    "Varpaisjärvi", "Vuorela", "Toivala",
+]
+
+
+def dataset_path(base, fmt='json'):
+    return f"{base}.{fmt}"
 
 
 
@@ -72,67 +106,184 @@ def argparse_word_frequency():
         ]
     get_field_word_frequency(file_path, target_fields)
 
-def argparse_realtime_data():
-    # Load JSON data
-    with open('data/processed/outage_data.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)  # data is a list of dicts
+def argparse_realtime_data(fmt='json', speedup=None, sink=None):
+    # Load processed data
+    data = list(read_records(dataset_path(PROCESSED_DATA, fmt)))  # data is a list of dicts
 
     # Convert to DataFrame
     df = pd.DataFrame(data)
 
-    # Stream outages
-    for outage in outage_stream(df, delay=0.1):
-        print(outage)
+    # Stream outages; with a speed-up at the outages' own start times
+    stream = OutageReplay(df, speedup=speedup) if speedup else outage_stream(df, delay=0.1)
 
-def argparse_data_analysis():
-    with open('data/processed/outage_data.json', 'r', encoding='utf-8') as file:
-        outage_data = json.load(file)
+    # The consumers read the stream from an event bus: a slow terminal drops
+    # its oldest outages instead of holding the stream back, the file sink gets them all
+    bus = EventBus()
+    consumers = [start_consumer(bus.subscribe('console', policy=DROP_OLDEST), print)]
+    if sink:
+        sink_subscription = bus.subscribe('sink', policy=BLOCK, block_timeout=SINK_BLOCK_TIMEOUT)
+        consumers.append(start_reader(sink_subscription, write_jsonl, sink))
+
+    try:
+        bus.pump(stream)
+    except KeyboardInterrupt:
+        print("Keskeytetty.")
+    for consumer in consumers:
+        consumer.join()
+    print(pd.DataFrame(bus.stats()).to_string(index=False))
 
-        analyzed_data_df = monthly_duration(outage_data)
+def load_analysis_data(columns, fmt='json'):
+    # Prefer the typed columnar store and read only the columns the analysis needs,
+    # unless the records file was changed after the table was built from it
+    path = dataset_path(PROCESSED_DATA, fmt)
+    if is_current(path):
+        return load_processed(columns=columns)
+    return list(read_records(path))
 
-        plot_monthly_duration_line(analyzed_data_df)
-        path = "reports/monthly_duration_outage_data.csv"
-        analyzed_data_df.to_csv(path, index=False)
+def analyze_monthly_duration(fmt='json'):
+    analyzed_data_df = monthly_duration(load_analysis_data(['year', 'month', 'duration_hours'], fmt))
 
-        location_summary_df = location_frequency(outage_data)
+    plot_monthly_duration_line(analyzed_data_df)
+    path = "reports/monthly_duration_outage_data.csv"
+    analyzed_data_df.to_csv(path, index=False)
+
+def analyze_location_frequency(fmt='json'):
+    location_summary_df = location_frequency(load_analysis_data(['location'], fmt))
     
-        # Generate the Location Bar Chart
-        plot_location_bar_chart(location_summary_df)
+    # Generate the Location Bar Chart
+    plot_location_bar_chart(location_summary_df)
     
-        # Save the location summary to CSV
-        location_summary_df.to_csv('reports/location_outage_summary.csv', index=False)
+    # Save the location summary to CSV
+    location_summary_df.to_csv('reports/location_outage_summary.csv', index=False)
 
-        cause_matrix_df = analyze_cause_by_location(outage_data) 
-        plot_cause_by_location(cause_matrix_df) 
-        cause_matrix_df.to_csv('reports/cause_by_location_matrix.csv')
+def analyze_cause_location(fmt='json'):
+    cause_matrix_df = analyze_cause_by_location(load_analysis_data(['location', 'tags'], fmt)) 
+    plot_cause_by_location(cause_matrix_df) 
+    cause_matrix_df.to_csv('reports/cause_by_location_matrix.csv')
 
-def argparse_interim_processor():
-    with open('data/interim/outage_data.json', 'r', encoding='utf-8') as file:
-        outage_data = json.load(file)
+def argparse_data_analysis(fmt='json'):
+    analyze_monthly_duration(fmt)
+    analyze_location_frequency(fmt)
+    analyze_cause_location(fmt)
+
+def argparse_train(fmt='json', offline=False, tune=False):
+    # Train the duration model on the processed data and save it with its feature schema
+    df = load_training_data(dataset_path(PROCESSED_DATA, fmt), offline=offline)
+    if tune:
+        # Time-ordered cross-validation of all candidates; the leaderboard picks the model
+        estimator, params = best_candidate(search(df))
+        train(df, estimator=estimator, params=params)
+    else:
+        train(df)
+
+def argparse_predict(fmt='json'):
+    # Score the processed notices with the saved model
+    records = list(read_records(dataset_path(PROCESSED_DATA, fmt)))
+    predictions = predict_batch(records)
+
+    df = pd.DataFrame(records)[['weekday', 'day', 'month', 'year', 'time_start', 'time_end', 'location']]
+    df['predicted_duration_hours'] = predictions.round(2)
+    df.to_csv(PREDICTIONS_PATH, index=False)
+    print(f"Predictions saved to {PREDICTIONS_PATH}")
+
+def argparse_online(fmt='json', batch_size=1):
+    # Predict-then-learn over the outages in time order; a saved model only
+    # learns the outages newer than those it has already seen
+    df = pd.DataFrame(list(read_records(dataset_path(PROCESSED_DATA, fmt))))
+    df['start_dt'] = add_duration_columns(df)['start_dt']
+    df = df.dropna(subset=['start_dt']).sort_values('start_dt', kind='stable')
+
+    model = OnlineDurationModel.load() if os.path.exists(ONLINE_MODEL_PATH) else OnlineDurationModel()
+    df = model.unlearned(df)
+    print(f"Uusia keskeytyksiä: {len(df)}")
+    if df.empty:
+        return
+
+    model, report = run_online(outage_stream(df, delay=0), model, batch_size=batch_size)
+    model.save()
+    report.to_csv(PREQUENTIAL_PATH, index=False)
+    print(f"Prequential error saved to {PREQUENTIAL_PATH}")
 
-        processed_data = filter_data(outage_data)
-        path = "data/processed/outage_data.json"
-        save_to_json(processed_data, path)
+def argparse_interim_processor(fmt='json'):
+    # Records are streamed from the interim file to the processed file
+    outage_data = read_records(dataset_path(INTERIM_DATA, fmt))
+
+    processed_data = iter_filter_data(outage_data)
+    save_records(processed_data, dataset_path(PROCESSED_DATA, fmt))
+
+    # Typed columnar copy for the analyses
+    save_to_parquet(read_records(dataset_path(PROCESSED_DATA, fmt)))
 
 # Function to process raw data (load, process, and save)
-def argparse_raw_processor():
-    # Load the raw outage data from file
-    with open('data/raw/outages/outage_data.json', 'r', encoding='utf-8') as file:
-        outage_data = json.load(file)
+def argparse_scrape(workers=1, rate=2.0, fmt='json', incremental=False, use_cache=False, offline=False,
+                    backend='strainer'):
+    # Scrape outage data and save it
+    set_default_backend(backend)
+    cache = PageCache(offline=offline) if (use_cache or offline) else None
+    if incremental:
+        raw_path = dataset_path(RAW_DATA, fmt)
+        outage_data, new_entries = scrape_incremental(raw_path=raw_path, cache=cache)
+        save_incremental(outage_data, new_entries, raw_path=raw_path,
+                         new_entries_path=dataset_path(NEW_ENTRIES_DATA, fmt))
+    else:
+        outage_data = scrape_outage_data(workers=workers, rate=rate, cache=cache)
+        save_records(outage_data, dataset_path(RAW_DATA, fmt))
+
+def build_pipeline(args):
+    """Declare the scrape -> process -> filter -> analysis stages as a DAG."""
+    fmt = args.format
+    raw, interim, processed = (dataset_path(base, fmt) for base in (RAW_DATA, INTERIM_DATA, PROCESSED_DATA))
+    analysis_inputs = [processed, PARQUET_PATH]
+
+    return Pipeline([
+        Stage('scrape', argparse_scrape, outputs=[raw],
+              code=['generators/spider.py', 'generators/extractors.py'],
+              kwargs={'workers': args.workers, 'rate': args.rate, 'fmt': fmt, 'incremental': args.incremental,
+                      'use_cache': args.cache, 'offline': args.offline, 'backend': args.parser}),
+        Stage('process', argparse_raw_processor, inputs=[raw], outputs=[interim], deps=['scrape'],
+              code=['processors/json_processor.py', 'processors/location_index.py'],
+              kwargs={'jobs': args.jobs, 'fmt': fmt}),
+        Stage('filter', argparse_interim_processor, inputs=[interim], outputs=[processed, PARQUET_PATH],
+              deps=['process'],
+              code=['processors/json_interim_processor.py', 'processors/columnar_processor.py'],
+              kwargs={'fmt': fmt}),
+        Stage('monthly_duration', analyze_monthly_duration, inputs=analysis_inputs,
+              outputs=['reports/monthly_duration_outage_data.csv', 'reports/charts/monthly_duration_line_chart_imputed.png'],
+              deps=['filter'], code=['analysis/temporal_analysis.py'], kwargs={'fmt': fmt}),
+        Stage('location_frequency', analyze_location_frequency, inputs=analysis_inputs,
+              outputs=['reports/location_outage_summary.csv', 'reports/charts/location_frequency_bar_chart.png'],
+              deps=['filter'], code=['analysis/geograpgical_analysis.py'], kwargs={'fmt': fmt}),
+        Stage('cause_location', analyze_cause_location, inputs=analysis_inputs,
+              outputs=['reports/cause_by_location_matrix.csv', 'reports/charts/cause_by_location_stacked_bar.png'],
+              deps=['filter'], code=['analysis/cause_location.py'], kwargs={'fmt': fmt}),
+        Stage('train', argparse_train, inputs=[processed], outputs=[MODEL_PATH], deps=['filter'],
+              code=['modeling/outage_duration_ml.py', 'modeling/model_search.py', 'api/weather.py'],
+              kwargs={'fmt': fmt, 'offline': args.offline, 'tune': args.search}),
+        Stage('predict', argparse_predict, inputs=[processed, MODEL_PATH], outputs=[PREDICTIONS_PATH],
+              deps=['train'], code=['modeling/outage_duration_ml.py'], kwargs={'fmt': fmt}),
+    ])
+
+def argparse_raw_processor(jobs=1, fmt='json'):
+    # Load the raw outage data from file (streamed for JSON Lines)
+    outage_data = read_records(dataset_path(RAW_DATA, fmt))
     
     # Process the data
-    # List of canonical cities
-    
-    canonical_cities = [
-    "Iisalmi", "Joensuu", "Joroinen", "Juankoski", "Karttula", "Keitele", 
-    "Kiuruvesi", "Lapinlahti", "Leppävirta", "Maaninka", "Nilsiä", "Pieksämäki", 
-    "Pielavesi", "Rautalampi", "Siilinjärvi", "Suonenjoki", "Tahkovuori", 
-    "Varpaisjärvi", "Vuorela", "Toivala",
-    ]
-    interim_data = raw_processor(outage_data, canonical_cities)
+    if jobs > 1:
+        interim_data = raw_processor_parallel(list(outage_data), canonical_cities, workers=jobs)
+    else:
+        interim_data = iter_raw_processor(outage_data, canonical_cities)
+
+    # Save processed data as interim, unescaped like the old save_to_interim_json
+    save_records(interim_data, dataset_path(INTERIM_DATA, fmt), ensure_ascii=False)
 
-    # Save processed data as interim
-    save_to_interim_json(interim_data, 'data/interim/outage_data.json')
+def argparse_stream_pipeline(fmt='jsonl'):
+    # Stream raw -> interim -> processed record by record; the interim stage is
+    # written on the way through, so memory use does not grow with the data.
+    # Only JSON Lines formats can be read and written a record at a time.
+    outage_data = read_records(dataset_path(RAW_DATA, fmt))
+    interim_data = tee_records(iter_raw_processor(outage_data, canonical_cities), dataset_path(INTERIM_DATA, fmt))
+    save_records(iter_filter_data(interim_data), dataset_path(PROCESSED_DATA, fmt))
+    save_to_parquet(read_records(dataset_path(PROCESSED_DATA, fmt)))
 
 # Main function for full data processing
 def main():
@@ -145,6 +296,28 @@ def main():
     parser.add_argument('--analyze', action='store_true', help='Analyze processes data')
     parser.add_argument('--generate', action='store_true', help='Generate realtime data from processed data')
     parser.add_argument('--display', action='store_true', help='Display analytics from processed data')
+    parser.add_argument('--speedup', type=float, help='With --generate: replay at event time, this many times faster')
+    parser.add_argument('--sink', help='With --generate: also write the streamed outages to this JSON Lines file')
+    parser.add_argument('--train', action='store_true', help='Train and save the outage duration model')
+    parser.add_argument('--search', action='store_true', help='With --train: pick the model by a parallel hyperparameter search')
+    parser.add_argument('--online', action='store_true', help='Update the online duration model with new outages')
+    parser.add_argument('--batch-size', type=int, default=1, help='Outages per update with --online')
+    parser.add_argument('--predict', action='store_true', help='Predict durations of the processed data with the saved model')
+    parser.add_argument('--workers', type=int, default=1, help='Number of concurrent scraper workers')
+    parser.add_argument('--incremental', action='store_true', help='Scrape only notices newer than the raw store')
+    parser.add_argument('--cache', action='store_true', help='Use the on-disk page cache with conditional requests')
+    parser.add_argument('--offline', action='store_true', help='Replay the scrape from cached pages without network')
+    parser.add_argument('--parser', default='strainer', help='HTML extractor backend: html.parser, strainer or lxml')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes for --process')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream raw data through processing and filtering in one pass (needs a jsonl --format)')
+    parser.add_argument('--format', default='json', choices=['json', 'jsonl', 'jsonl.gz', 'jsonl.zst'],
+                        help='Dataset storage format (json is the pretty-printed export)')
+    parser.add_argument('--rate', type=float, default=2.0, help='Max pages per second for the concurrent scraper')
+    parser.add_argument('--all', action='store_true', help='Run the whole pipeline, skipping up-to-date stages')
+    parser.add_argument('--only', nargs='+', metavar='STAGE', help='With --all: run only these stages and their dependencies')
+    parser.add_argument('--force', nargs='*', metavar='STAGE',
+                        help='With --all: re-run these stages (all stages if none given) even if up to date')
 
     # Parse command-line arguments
     args = parser.parse_args()
@@ -152,35 +325,59 @@ def main():
     if args.process:
         # Run the raw data processing (load, process, save)
         print("Prosessoidaan raakadataa...")
-        argparse_raw_processor()
+        argparse_raw_processor(jobs=args.jobs, fmt=args.format)
+
+    elif args.stream:
+        if not args.format.startswith('jsonl'):
+            parser.error("--stream needs a JSON Lines --format (jsonl, jsonl.gz or jsonl.zst)")
+        print("Prosessoidaan ja suodatetaan dataa virtana...")
+        argparse_stream_pipeline(fmt=args.format)
 
     elif args.filter:
         print("Suodatetaan interim dataa...")
-        argparse_interim_processor()
+        argparse_interim_processor(fmt=args.format)
 
     elif args.analyze:
         print("Analysoidaan dataa...")
-        argparse_data_analysis()
+        argparse_data_analysis(fmt=args.format)
+
+    elif args.train:
+        print("Koulutetaan kestomallia...")
+        argparse_train(fmt=args.format, offline=args.offline, tune=args.search)
+
+    elif args.online:
+        print("Päivitetään online-mallia...")
+        argparse_online(fmt=args.format, batch_size=args.batch_size)
+
+    elif args.predict:
+        print("Ennustetaan keskeytysten kestoja...")
+        argparse_predict(fmt=args.format)
 
     elif args.generate:
         print("Generoidaan dataa...")
-        argparse_realtime_data()
+        argparse_realtime_data(fmt=args.format, speedup=args.speedup, sink=args.sink)
 
     elif args.display:
         print("Avaa localhost portti:8050")
-        argparse_realtime_data()
+        argparse_realtime_data(fmt=args.format)
 
     elif args.all:
         print("Suoritetaan kaikki prosessit...")
-        argparse_extract_all()
+        force = True if args.force == [] else (args.force or ())
+        pipeline = build_pipeline(args)
+        try:
+            pipeline.validate((args.only or []) + (args.force or []))
+        except ValueError as e:
+            parser.error(str(e))
+        pipeline.run(targets=args.only, force=force)
 
     else:
         # Scrape outage data and save it
-        outage_data = scrape_outage_data()
-        save_to_json(outage_data, 'data/raw/outages/outage_data.json')
+        argparse_scrape(workers=args.workers, rate=args.rate, fmt=args.format, incremental=args.incremental,
+                        use_cache=args.cache, offline=args.offline, backend=args.parser)
 
-        # Fetch weather data
-        data = weatherApi()
+        # Fetch weather data (skipped when replaying offline)
+        data = weatherApi(cache=ObservationCache(), query=FMIClient()) if not args.offline else None
 
         if data:
             for station, weather_data in data.items():
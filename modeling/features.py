@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction import FeatureHasher
+
+from utils.durations import parse_clock, parse_year
+
+CATEGORICAL_COLUMNS = ['weekday', 'location', 'season']
+NUMERIC_COLUMNS = ['lampotila_celsius', 'latitude', 'longitude', 'Is_Huolto', 'Is_Saneeraus', 'year_int', 'start_hour']
+TAG_COLUMN = 'tags'
+
+SEASONS = {12: 'Talvi', 1: 'Talvi', 2: 'Talvi', 3: 'Kevat', 4: 'Kevat', 5: 'Kevat',
+           6: 'Kesa', 7: 'Kesa', 8: 'Kesa', 9: 'Syksy', 10: 'Syksy', 11: 'Syksy'}
+
+# Tags with their own flag feature
+FLAG_TAGS = {'Is_Huolto': 'huollosta', 'Is_Saneeraus': 'saneeraustöistä'}
+
+UNKNOWN = 'Tuntematon'
+
+# Width of the hashed block of HashingFeatureEncoder
+HASH_FEATURES = 2 ** 12
+
+
+def explode_tags(tags):
+    """
+    Flatten a column of tag lists into one row per (outage, tag).
+
+    Returns:
+        pd.Series: Tags indexed by the outage's position; outages without tags are left out.
+    """
+    # Empty lists and missing values explode to NaN
+    return pd.Series(list(tags), dtype=object).explode().dropna()
+
+
+def add_features(df):
+    """Add the derived model features to an outage DataFrame (a copy is returned)."""
+    df = df.copy()
+    n = len(df)
+
+    # Tag flags from one pass over the exploded tags instead of a lambda per row
+    tags = explode_tags(df[TAG_COLUMN]) if TAG_COLUMN in df.columns else pd.Series(dtype=object)
+    for column, tag in FLAG_TAGS.items():
+        rows = tags.index[tags.to_numpy() == tag].unique()
+        flag = np.zeros(n, dtype=np.int8)
+        flag[np.asarray(rows, dtype=int)] = 1
+        df[column] = flag
+
+    if 'month' in df.columns:
+        df['season'] = pd.to_numeric(df['month'], errors='coerce').map(SEASONS).fillna(UNKNOWN)
+    else:
+        df['season'] = UNKNOWN
+
+    # Imputed years ("2024 (Puuttuva vuosi ...)") keep their year
+    df['year_int'] = parse_year(df['year']) if 'year' in df.columns else np.nan
+    # Clock strings are not usable as features; use the start hour instead
+    df['start_hour'] = parse_clock(df['time_start'].to_numpy()) / 60 if 'time_start' in df.columns else np.nan
+
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            df[col] = UNKNOWN
+    for col in NUMERIC_COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    return df
+
+
+class FeatureEncoder:
+    """
+    Fitted encoder from outage feature frames to a sparse model matrix.
+
+    Columns, in order: the numeric features with missing values filled, one
+    one-hot block per categorical column (categories in pd.get_dummies order)
+    and one column per tag of the fixed tag vocabulary. The vocabularies are
+    learned by `fit` and saved with the model, so prediction always produces
+    the training layout; unseen categories and tags encode as zeros.
+    """
+
+    def __init__(self, numeric=NUMERIC_COLUMNS, categorical=CATEGORICAL_COLUMNS, tag_column=TAG_COLUMN,
+                 min_tag_count=1):
+        self.numeric = list(numeric)
+        self.categorical = list(categorical)
+        self.tag_column = tag_column
+        self.min_tag_count = min_tag_count
+
+    def fit(self, features):
+        """Learn the vocabularies and fill values from a feature frame (see add_features)."""
+        self.categories_ = {
+            col: sorted(features[col].dropna().astype(str).unique())
+            for col in self.categorical
+        }
+
+        tag_counts = explode_tags(features[self.tag_column]).value_counts() if self.tag_column in features else pd.Series()
+        self.tags_ = sorted(tag_counts.index[tag_counts >= self.min_tag_count])
+
+        fill_values = {col: float(pd.to_numeric(features[col], errors='coerce').median()) for col in self.numeric}
+        self.fill_values_ = {col: (0.0 if pd.isna(value) else value) for col, value in fill_values.items()}
+
+        # Coordinates of the known locations, so prediction needs no geocoding
+        coordinates = features.dropna(subset=['latitude', 'longitude']).groupby('location')[['latitude', 'longitude']].first()
+        self.location_coordinates_ = {loc: (row.latitude, row.longitude) for loc, row in coordinates.iterrows()}
+
+        self.feature_names_ = (
+            self.numeric
+            + [f"{col}_{value}" for col in self.categorical for value in self.categories_[col]]
+            + [f"tag_{tag}" for tag in self.tags_]
+        )
+        return self
+
+    def transform(self, features):
+        """
+        Returns:
+            scipy.sparse.csr_matrix: float32 matrix of shape (rows, len(feature_names_)).
+        """
+        n = len(features)
+        rows = np.arange(n)
+
+        # Rows that were not geocoded get the coordinates of their location
+        locations = features['location'].astype(str)
+        numeric = np.empty((n, len(self.numeric)), dtype=np.float32)
+        for j, col in enumerate(self.numeric):
+            values = pd.to_numeric(features[col], errors='coerce').to_numpy(dtype=float)
+            if col in ('latitude', 'longitude'):
+                i = 0 if col == 'latitude' else 1
+                known = locations.map({loc: coords[i] for loc, coords in self.location_coordinates_.items()})
+                values = np.where(np.isnan(values), known.to_numpy(dtype=float), values)
+            numeric[:, j] = np.where(np.isnan(values), self.fill_values_[col], values)
+
+        blocks = [sp.csr_matrix(numeric)]
+        for col in self.categorical:
+            codes = pd.Categorical(features[col].astype(str), categories=self.categories_[col]).codes
+            blocks.append(self._one_hot(rows, codes, n, len(self.categories_[col])))
+
+        if self.tag_column in features:
+            tags = explode_tags(features[self.tag_column])
+            codes = pd.Categorical(tags.to_numpy(), categories=self.tags_).codes
+            blocks.append(self._one_hot(tags.index.to_numpy(dtype=int), codes, n, len(self.tags_)))
+        else:
+            blocks.append(sp.csr_matrix((n, len(self.tags_)), dtype=np.float32))
+
+        return sp.hstack(blocks, format='csr', dtype=np.float32)
+
+    def fit_transform(self, features):
+        return self.fit(features).transform(features)
+
+    @staticmethod
+    def _one_hot(rows, codes, n_rows, n_columns):
+        """Sparse indicator block; code -1 (unseen value) gives no entry, duplicates count once."""
+        seen = codes >= 0
+        block = sp.csr_matrix(
+            (np.ones(seen.sum(), dtype=np.float32), (rows[seen], codes[seen])), shape=(n_rows, n_columns)
+        )
+        block.sum_duplicates()
+        block.data[:] = 1
+        return block
+
+
+class HashingFeatureEncoder:
+    """
+    Stateless encoder for online learning: the numeric features (missing
+    values left as NaN) followed by a fixed-width block of hashed
+    "column=value" and "tag=value" tokens. New villages and tags need no
+    refit and never change the layout.
+    """
+
+    def __init__(self, numeric=NUMERIC_COLUMNS, categorical=CATEGORICAL_COLUMNS, tag_column=TAG_COLUMN,
+                 n_features=HASH_FEATURES):
+        self.numeric = list(numeric)
+        self.categorical = list(categorical)
+        self.tag_column = tag_column
+        self.hasher = FeatureHasher(n_features=n_features, input_type='string', alternate_sign=False)
+
+    def fit(self, features):
+        return self
+
+    def transform(self, features):
+        """
+        Returns:
+            scipy.sparse.csr_matrix: float32 matrix of shape (rows, len(numeric) + n_features).
+        """
+        numeric = np.column_stack([
+            pd.to_numeric(features[col], errors='coerce').to_numpy(dtype=np.float32) for col in self.numeric
+        ])
+
+        columns = [(f"{col}=" + features[col].astype(str)).tolist() for col in self.categorical]
+        tags = features[self.tag_column] if self.tag_column in features else [None] * len(features)
+        tokens = (
+            [*values, *(f"tag={tag}" for tag in (row_tags if isinstance(row_tags, list) else []))]
+            for *values, row_tags in zip(*columns, tags)
+        )
+
+        return sp.hstack([sp.csr_matrix(numeric), self.hasher.transform(tokens)], format='csr', dtype=np.float32)
@@ -0,0 +1,129 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.model_selection import ParameterGrid, TimeSeriesSplit
+from sklearn.metrics import mean_squared_error, r2_score
+from math import sqrt
+
+from modeling.features import FeatureEncoder, add_features
+from modeling.outage_duration_ml import ESTIMATORS, TARGET, load_training_data, model_input
+
+LEADERBOARD_PATH = 'reports/model_leaderboard.csv'
+
+# Candidate grids per estimator; every combination is cross-validated
+PARAM_GRIDS = {
+    'random_forest': {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [None, 12],
+        'min_samples_leaf': [1, 5],
+    },
+    'hist_gradient_boosting': {
+        'learning_rate': [0.05, 0.1],
+        'max_iter': [100, 300],
+        'max_leaf_nodes': [15, 31],
+    },
+}
+
+
+def time_ordered_folds(start_times, n_splits=5):
+    """
+    Cross-validation folds that always train on the past and test on the
+    following period: rows are ordered by start time and split with
+    TimeSeriesSplit.
+
+    Returns:
+        list: (train indices, test indices) pairs into the original row order.
+    """
+    order = np.argsort(pd.to_datetime(start_times).to_numpy(), kind='stable')
+    return [(order[train], order[test]) for train, test in TimeSeriesSplit(n_splits=n_splits).split(order)]
+
+
+def evaluate_fold(name, params, features, y, train_index, test_index, random_state=42):
+    """
+    Fit one candidate on one fold; returns its errors and fit / predict times.
+
+    The feature encoder is fitted on the fold's training rows only, so the
+    test period's categories and tags do not leak into the training layout.
+    """
+    encoder = FeatureEncoder().fit(features.iloc[train_index])
+    X_train = model_input(encoder.transform(features.iloc[train_index]), name, fit=True)
+    X_test = model_input(encoder.transform(features.iloc[test_index]), name)
+    model = ESTIMATORS[name](random_state=random_state, **params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y[train_index])
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'model': name,
+        'params': json.dumps(params, sort_keys=True),
+        'rmse': sqrt(mean_squared_error(y[test_index], y_pred)),
+        'r2': r2_score(y[test_index], y_pred),
+        'fit_seconds': fit_seconds,
+        'predict_ms_per_1k': predict_seconds / len(test_index) * 1000 * 1000,
+    }
+
+
+def search(df=None, param_grids=PARAM_GRIDS, n_splits=5, n_jobs=-1, report_path=LEADERBOARD_PATH, offline=False):
+    """
+    Cross-validate every candidate of `param_grids` on time-ordered folds, one
+    (candidate, fold) task per core, and write the leaderboard.
+
+    Every fold is scored with a single-core estimator so the fit and predict
+    times of the candidates are comparable; the times leave out the encoding.
+
+    Returns:
+        pd.DataFrame: Candidates ordered by mean RMSE, with R2, fit seconds and
+                      prediction latency (ms per 1000 rows) averaged over the folds.
+    """
+    if df is None:
+        df = load_training_data(offline=offline)
+
+    features = add_features(df).dropna(subset=[TARGET, 'start_timestamp']).reset_index(drop=True)
+    y = features[TARGET].to_numpy(dtype=float)
+    folds = time_ordered_folds(features['start_timestamp'], n_splits)
+
+    candidates = [(name, params) for name, grid in param_grids.items() for params in ParameterGrid(grid)]
+    print(f"Evaluating {len(candidates)} candidates x {len(folds)} folds...")
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(name, params, features, y, train_index, test_index)
+        for name, params in candidates
+        for train_index, test_index in folds
+    )
+
+    leaderboard = (
+        pd.DataFrame(results)
+        .groupby(['model', 'params'], as_index=False)
+        .agg(rmse=('rmse', 'mean'), rmse_std=('rmse', 'std'), r2=('r2', 'mean'),
+             fit_seconds=('fit_seconds', 'mean'), predict_ms_per_1k=('predict_ms_per_1k', 'mean'))
+        .sort_values(['rmse', 'predict_ms_per_1k'])
+        .reset_index(drop=True)
+    )
+
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    leaderboard.to_csv(report_path, index=False)
+    print(f"Leaderboard saved to {report_path}")
+    print(leaderboard.head(10).to_string(index=False))
+
+    return leaderboard
+
+
+def best_candidate(leaderboard, max_predict_ms_per_1k=None):
+    """
+    Return (estimator name, params) of the most accurate candidate, optionally
+    only among those scoring 1000 rows within `max_predict_ms_per_1k`.
+    """
+    if max_predict_ms_per_1k is not None:
+        leaderboard = leaderboard[leaderboard['predict_ms_per_1k'] <= max_predict_ms_per_1k]
+    if leaderboard.empty:
+        raise ValueError("No candidate meets the latency limit.")
+    best = leaderboard.iloc[0]
+    return best['model'], json.loads(best['params'])
@@ -0,0 +1,233 @@
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import joblib
+from sklearn.linear_model import SGDRegressor
+from sklearn.preprocessing import StandardScaler
+
+from modeling.features import HashingFeatureEncoder, add_features
+from utils.durations import duration_hours
+
+ONLINE_MODEL_PATH = 'models/duration_online.joblib'
+PREQUENTIAL_PATH = 'reports/prequential_error.csv'
+
+SGD_PARAMS = {'loss': 'huber', 'epsilon': 2.0, 'alpha': 1e-4, 'learning_rate': 'invscaling', 'eta0': 0.1,
+              'average': True, 'random_state': 42}
+
+# Weight of the previous value in the faded (recent) error
+FADING = 0.99
+
+# Columns identifying an outage among those starting at the same time
+KEY_COLUMNS = ['weekday', 'day', 'month', 'year', 'time_start', 'time_end', 'location', 'tags']
+
+
+def to_frame(records):
+    """Outage records (a dict, list of dicts or DataFrame) as a DataFrame."""
+    if isinstance(records, pd.DataFrame):
+        return records.reset_index(drop=True)
+    if isinstance(records, dict):
+        records = [records]
+    return pd.DataFrame(list(records))
+
+
+def outage_keys(df):
+    """One string per outage of `df` built from its KEY_COLUMNS."""
+    columns = [col for col in KEY_COLUMNS if col in df.columns]
+    return ['|'.join(map(str, row)) for row in zip(*(df[col].tolist() for col in columns))]
+
+
+def target(df):
+    """Duration in hours of the outages in `df`; NaN where the times are invalid."""
+    if 'duration_hours' in df.columns:
+        return pd.to_numeric(df['duration_hours'], errors='coerce').to_numpy(dtype=float)
+    return duration_hours(df['time_start'].to_numpy(), df['time_end'].to_numpy())
+
+
+class OnlineDurationModel:
+    """
+    Duration model updated incrementally with SGDRegressor.partial_fit.
+
+    Features come from HashingFeatureEncoder, so the layout stays fixed as new
+    villages and tags appear. The numeric block is standardized with a scaler
+    updated along with the model; missing numeric values become the mean.
+    """
+
+    def __init__(self, encoder=None, **sgd_params):
+        self.encoder = encoder or HashingFeatureEncoder()
+        self.scaler = StandardScaler()
+        self.model = SGDRegressor(**{**SGD_PARAMS, **sgd_params})
+        self.seen = 0
+        # Latest start_dt learned from, and the keys of the outages learned at
+        # exactly that time, so a saved model can continue with the rest only
+        self.learned_until = None
+        self.learned_keys = set()
+
+    def _scale(self, X, learn=False):
+        """Standardize the numeric block of an encoded matrix, updating the scaler first if `learn`."""
+        k = len(self.encoder.numeric)
+        numeric = X[:, :k].toarray()
+        if learn:
+            # Columns that are still all missing (e.g. no weather yet) divide by zero samples
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.scaler.partial_fit(numeric)
+        numeric = np.nan_to_num(self.scaler.transform(numeric), nan=0.0)
+        return sp.hstack([sp.csr_matrix(numeric), X[:, k:]], format='csr')
+
+    def _learn(self, df, X, y):
+        valid = ~np.isnan(y)
+        if not valid.any():
+            return 0
+
+        self.model.partial_fit(self._scale(X[valid], learn=True), y[valid])
+        self.seen += int(valid.sum())
+
+        if 'start_dt' in df.columns:
+            start = pd.to_datetime(df['start_dt'])
+            latest = start.max()
+            keys = set(outage_keys(df[(start == latest).to_numpy()]))
+            if self.learned_until is None or latest > self.learned_until:
+                self.learned_until = latest
+                self.learned_keys = keys
+            elif latest == self.learned_until:
+                self.learned_keys |= keys
+        return int(valid.sum())
+
+    def unlearned(self, df):
+        """
+        The outages of `df` (with a start_dt column) the model has not learned
+        yet: those after learned_until, and those at learned_until that were
+        not among the outages learned at that time.
+        """
+        if self.learned_until is None:
+            return df
+        start = pd.to_datetime(df['start_dt'])
+        tie = (start == self.learned_until).to_numpy()
+        new_tie = np.zeros(len(df), dtype=bool)
+        new_tie[tie] = [key not in self.learned_keys for key in outage_keys(df[tie])]
+        return df[(start > self.learned_until).to_numpy() | new_tie]
+
+    def partial_fit(self, records):
+        """Update the model with outages whose duration is known; returns the number used."""
+        df = to_frame(records)
+        return self._learn(df, self.encoder.transform(add_features(df)), target(df))
+
+    def predict(self, records):
+        """Predicted durations in hours; NaN before the first update."""
+        df = to_frame(records)
+        if self.seen == 0:
+            return np.full(len(df), np.nan)
+        return self.model.predict(self._scale(self.encoder.transform(add_features(df))))
+
+    def predict_then_learn(self, records):
+        """
+        Predict `records` with the current model, then learn from them; the
+        records are encoded once for both.
+
+        Returns:
+            tuple: (durations, predictions made before learning)
+        """
+        df = to_frame(records)
+        X = self.encoder.transform(add_features(df))
+        y = target(df)
+        predictions = np.full(len(df), np.nan) if self.seen == 0 else self.model.predict(self._scale(X))
+        self._learn(df, X, y)
+        return y, predictions
+
+    def save(self, path=ONLINE_MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=ONLINE_MODEL_PATH):
+        return joblib.load(path)
+
+
+class PrequentialError:
+    """
+    Running predict-then-learn error: every outage is scored before the model
+    learns from it. Keeps the cumulative MAE / RMSE, a faded MAE that follows
+    the recent error, and the MAE of a running-mean baseline.
+    """
+
+    def __init__(self, fading=FADING):
+        self.fading = fading
+        self.n = 0
+        self.abs_sum = 0.0
+        self.sq_sum = 0.0
+        self.faded_abs = 0.0
+        self.faded_n = 0.0
+        self.target_sum = 0.0
+        self.baseline_abs_sum = 0.0
+
+    def update(self, y_true, y_pred):
+        for actual, predicted in zip(np.asarray(y_true, dtype=float), np.asarray(y_pred, dtype=float)):
+            if np.isnan(actual):
+                continue
+            # Before the first update the model cannot predict; count it as the baseline does
+            baseline = self.target_sum / self.n if self.n else 0.0
+            if np.isnan(predicted):
+                predicted = baseline
+
+            error = abs(actual - predicted)
+            self.n += 1
+            self.abs_sum += error
+            self.sq_sum += error ** 2
+            self.faded_abs = self.fading * self.faded_abs + error
+            self.faded_n = self.fading * self.faded_n + 1
+            self.baseline_abs_sum += abs(actual - baseline)
+            self.target_sum += actual
+
+    def summary(self):
+        if self.n == 0:
+            return {'n': 0, 'mae': np.nan, 'rmse': np.nan, 'faded_mae': np.nan, 'baseline_mae': np.nan}
+        return {
+            'n': self.n,
+            'mae': self.abs_sum / self.n,
+            'rmse': np.sqrt(self.sq_sum / self.n),
+            'faded_mae': self.faded_abs / self.faded_n,
+            'baseline_mae': self.baseline_abs_sum / self.n,
+        }
+
+
+def batched(stream, batch_size):
+    """Group the events of `stream` into lists of at most `batch_size`."""
+    batch = []
+    for event in stream:
+        batch.append(event)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_online(stream, model=None, batch_size=1, report_every=500):
+    """
+    Prequential learning over an outage stream: predict every batch, score the
+    prediction, then learn from the batch.
+
+    Args:
+        stream (iterable): Outage dicts, e.g. realtime_generator.outage_stream.
+        model (OnlineDurationModel): Model to continue updating; a new one if None.
+
+    Returns:
+        tuple: (model, pd.DataFrame of the prequential error every `report_every` outages)
+    """
+    model = model or OnlineDurationModel()
+    error = PrequentialError()
+    checkpoints = []
+    next_report = report_every
+
+    for batch in batched(stream, batch_size):
+        error.update(*model.predict_then_learn(batch))
+
+        if error.n >= next_report:
+            checkpoints.append(error.summary())
+            summary = checkpoints[-1]
+            print(f" ...{summary['n']} outages | MAE {summary['mae']:.2f} h | recent {summary['faded_mae']:.2f} h"
+                  f" | baseline {summary['baseline_mae']:.2f} h")
+            next_report += report_every
+
+    checkpoints.append(error.summary())
+    return model, pd.DataFrame(checkpoints).drop_duplicates('n')
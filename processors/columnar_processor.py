@@ -0,0 +1,82 @@
+import os
+import pandas as pd
+from utils.durations import add_duration_columns
+
+PARQUET_PATH = 'data/processed/outage_data.parquet'
+
+# Imputed years look like "2024 (Puuttuva vuosi generoitu ympärillä olevasta datasta)"
+YEAR_PATTERN = r'^\s*(\d{4})'
+IMPUTED_YEAR_MARKER = 'Puuttuva vuosi'
+
+
+def records_to_frame(records):
+    """
+    Build the typed processed table from processed outage records.
+
+    Columns:
+        weekday, location: categorical
+        day, month, year: nullable integers
+        year_imputed: True if the year was generated from the surrounding data
+        time_start, time_end: the original clock strings
+        start_dt, end_dt: start and end timestamps (end on the next day after midnight)
+        duration_hours: the canonical outage duration
+        tags: list of strings
+    """
+    df = pd.DataFrame(list(records))
+
+    year_text = df['year'].astype('string')
+    typed = pd.DataFrame({
+        'weekday': df['weekday'].astype('category'),
+        'day': pd.to_numeric(df['day'], errors='coerce').astype('Int8'),
+        'month': pd.to_numeric(df['month'], errors='coerce').astype('Int8'),
+        'year': pd.to_numeric(year_text.str.extract(YEAR_PATTERN)[0], errors='coerce').astype('Int16'),
+        'year_imputed': year_text.str.contains(IMPUTED_YEAR_MARKER, regex=False).fillna(False).astype(bool),
+        'time_start': df['time_start'].astype('string'),
+        'time_end': df['time_end'].astype('string'),
+        'location': df['location'].astype('category'),
+        'tags': df['tags'],
+    })
+
+    times = add_duration_columns(df[['day', 'month', 'year', 'time_start', 'time_end']])
+    typed['start_dt'] = times['start_dt']
+    typed['end_dt'] = times['end_dt']
+    typed['duration_hours'] = times['duration_hours']
+
+    return typed
+
+
+def save_to_parquet(records, filename=PARQUET_PATH):
+    """Save processed records as a typed Parquet table."""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+    df = records_to_frame(records)
+    df.to_parquet(filename, index=False)
+
+    print(f"Columnar data saved to {filename}")
+    return df
+
+
+def load_processed(filename=PARQUET_PATH, columns=None):
+    """
+    Load the typed processed table, reading only `columns` if given.
+
+    Args:
+        filename (str): Path to the Parquet file.
+        columns (list): Column projection, e.g. ['location', 'tags'].
+
+    Returns:
+        pd.DataFrame: The typed table.
+    """
+    return pd.read_parquet(filename, columns=columns)
+
+
+def is_current(records_path, filename=PARQUET_PATH):
+    """
+    Return True if the Parquet table exists and is at least as new as the
+    processed records file it was built from (or that file is missing).
+    """
+    if not os.path.exists(filename):
+        return False
+    if not os.path.exists(records_path):
+        return True
+    return os.path.getmtime(filename) >= os.path.getmtime(records_path)
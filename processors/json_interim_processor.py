@@ -11,11 +11,18 @@ def filter_data(interim_data, required_fields=None):
     Returns:
         list: Filtered list of dictionaries.
     """
+    return list(iter_filter_data(interim_data, required_fields))
+
+
+def iter_filter_data(interim_data, required_fields=None):
+    """
+    Generator version of filter_data: yields the complete entries of any
+    iterable one at a time, so records can be streamed from the interim to
+    the processed stage.
+    """
     if required_fields is None:
         
         required_fields = ['location', 'tags', 'time_start', 'time_end']
-        
-    cleaned_data = []
     
     for entry in interim_data:
         is_complete = True
@@ -36,6 +43,4 @@ def filter_data(interim_data, required_fields=None):
                 break
         
         if is_complete:
-            cleaned_data.append(entry)
-            
-    return cleaned_data
\ No newline at end of file
+            yield entry
@@ -1,6 +1,9 @@
 import re
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from processors.location_index import LocationIndex
 
 # List of canonical cities (unchanged)
 canonical_cities = [
@@ -11,53 +14,95 @@ canonical_cities = [
 ]
 
 
-def filter_prefix_keywords(tags_text):
+# Prefixes of the cause words collected into 'tags'
+PREFIXES = ["kauko", "huol", "jake", "saneer","lämmö", "kesk", "vahin", "kaiv", "sähk", "vaurio", "korj", "per"]
+
+WHITESPACE = r"[\s\xa0]"
+
+# The leading '.*?' and optional 'tänään' of the old pattern are dropped: re.search
+# already tries every start position and neither of them is captured.
+NOTICE_PATTERN = (
+    rf"(?i)"
+    rf"(maanantaina|tiistaina|keskiviikkona|torstaina|perjantaina|lauantaina|sunnuntaina){WHITESPACE}*"  # Weekday
+    rf"(\d{{1,2}})\.(\d{{1,2}})(?:\.(\d{{4}}))?"                                                         # Date parts (day, month, year)
+    rf"{WHITESPACE}*\.?"                                                                                 # Optional trailing dot
+    rf"(?:" # Time block (optional)
+    rf"{WHITESPACE}*"
+    rf"(?:kello|klo){WHITESPACE}*"  # Time prefix (optional)
+    rf"(\d{{1,2}}(?:[:\.]\d{{2}})?)?"  # Start Time (Minutes optional)
+    rf"[–-]*"  # Separator
+    rf"(\d{{1,2}}(?:[:\.]\d{{2}})?)?"  # End Time (Minutes optional)
+    rf")?"  # End non-capturing optional block
+    rf"{WHITESPACE}*(.*)"  # Tags/Message
+)
+
+
+class NoticeParser:
     """
-    Filters the raw text to return the full word matching the prefix criteria.
+    Holds the compiled patterns used to parse outage notices.
+
+    Build it once and reuse it for every entry; the module level functions
+    below are thin wrappers kept for the old call sites.
     """
-    prefixes = ["kauko", "huol", "jake", "saneer","lämmö", "kesk", "vahin", "kaiv", "sähk", "vaurio", "korj", "per"]
-    
-    # CORRECTED PATTERN:
-    # 1. (?:...) is a non-capturing group for the prefixes.
-    # 2. (...) is the outer capturing group for the FULL word.
-    prefix_pattern = r'\b((?:' + '|'.join(prefixes) + r')\w*)\b'
-    
-    return re.findall(prefix_pattern, tags_text, re.IGNORECASE)
 
-def process_data(entry, canonical_cities, last_valid_year, last_valid_month):
-    """Process each entry and return processed data along with the updated last_valid_year."""
-    WHITESPACE = r"[\s\xa0]"
-    
-    FINAL_PATTERN = (
-        rf"(?i).*?"
-        rf"(?:tänään{WHITESPACE}+)?"
-        rf"(maanantaina|tiistaina|keskiviikkona|torstaina|perjantaina|lauantaina|sunnuntaina){WHITESPACE}*"  # Weekday
-        rf"(\d{{1,2}})\.(\d{{1,2}})(?:\.(\d{{4}}))?"                                                         # Date parts (day, month, year)
-        rf"{WHITESPACE}*\.?"                                                                                 # Optional trailing dot
-        rf"(?:" # Time block (optional)
-        rf"{WHITESPACE}*"
-        rf"(?:kello|klo){WHITESPACE}*"  # Time prefix (optional)
-        rf"(\d{{1,2}}(?:[:\.]\d{{2}})?)?"  # Start Time (Minutes optional)
-        rf"[–-]*"  # Separator
-        rf"(\d{{1,2}}(?:[:\.]\d{{2}})?)?"  # End Time (Minutes optional)
-        rf")?"  # End non-capturing optional block
-        rf"{WHITESPACE}*(.*)"  # Tags/Message
-    )
-
-    match = re.search(FINAL_PATTERN, entry)
-    
-    if match:
-        weekday     = match.group(1)
-        day         = match.group(2)
-        month       = match.group(3)
-        year        = match.group(4) if match.group(4) else "Unknown"
-        time_start  = match.group(5) 
-        time_end    = match.group(6) if match.group(6) else "Unknown"
-        message     = match.group(7).strip()
-        tags        = filter_prefix_keywords(message)
+    def __init__(self, canonical_cities=canonical_cities, prefixes=PREFIXES, aliases=None):
+        self.notice_re = re.compile(NOTICE_PATTERN)
+
+        # 1. (?:...) is a non-capturing group for the prefixes.
+        # 2. (...) is the outer capturing group for the FULL word.
+        # 3. The lookahead on the first letters lets the scan skip most positions
+        #    without trying every alternative (not valid with an empty prefix).
+        first_letters = '' if '' in prefixes else r'(?=[' + re.escape(''.join(sorted({p[0] for p in prefixes}))) + r'])'
+        self.prefix_re = re.compile(r'\b' + first_letters + r'((?:' + '|'.join(prefixes) + r')\w*)\b', re.IGNORECASE)
+        self.location_index = LocationIndex(canonical_cities, aliases)
+
+    def filter_prefix_keywords(self, tags_text):
+        """Return the full words of `tags_text` that start with one of the cause prefixes."""
+        return self.prefix_re.findall(tags_text)
+
+    def find_location(self, entry):
+        """Return the longest canonical city whose 5-letter prefix starts a word of the entry."""
+        return self.location_index.find(entry)
+
+    def parse_fields(self, entry):
+        """
+        Parse everything that does not depend on the surrounding entries.
+
+        Returns:
+            tuple: (processed entry with 'year' still unresolved, captured year
+                    or None), or None if the entry does not match.
+        """
+        match = self.notice_re.search(entry)
+
+        if not match:
+            return None
+
+        weekday, day, month, year, time_start, time_end, message = match.groups()
+        time_end    = time_end if time_end else "Unknown"
+        # The tags stay a second findall over the message group only: a group
+        # inside a repeat keeps just its last capture, so notice_re cannot
+        # return every cause word itself, and the scan starts after the date
+        # and time instead of at the start of the entry
+        tags        = self.filter_prefix_keywords(message)
+
+        return {
+            'weekday': weekday,
+            'day': day,
+            'month': month,
+            'year': None,  # Resolved by resolve_year, keeps the key order
+            'time_start': time_start,
+            'time_end': time_end,
+            'tags': tags,
+            'location': self.find_location(entry),
+        }, year
+
+    @staticmethod
+    def resolve_year(processed_entry, year, last_valid_year, last_valid_month):
+        """Fill in the year of a parsed entry and return the updated last_valid_year and last_valid_month."""
+        month = processed_entry['month']
 
         # If year is explicitly captured, use it; otherwise, use last_valid_year
-        if year != "Unknown":  # If year is captured, update last_valid_year
+        if year:  # If year is captured, update last_valid_year
             last_valid_year = year
             final_year_output = year
             last_valid_month = month
@@ -66,55 +111,96 @@ def process_data(entry, canonical_cities, last_valid_year, last_valid_month):
             if last_valid_year and int(month) > int(last_valid_month):
                 print(f"m: {month} lvm: {last_valid_month}")
                 final_year_output = f"{int(last_valid_year)-1} (Puuttuva vuosi generoitu ympärillä olevasta datasta)"
-                
+
             elif last_valid_year:
                 final_year_output = f"{last_valid_year} (Puuttuva vuosi generoitu ympärillä olevasta datasta)"
             else:
                 final_year_output = "2025"  # Default to 2025 if no year is found
 
-        # --- Location Extraction ---
-        location = None 
-        entry_lower = entry.lower()
-        entry_words = re.findall(r'\b[a-zåäö]{3,}\b', entry_lower)
-        sorted_cities = sorted(canonical_cities, key=len, reverse=True)
-        FIXED_MATCH_LEN = 5
-        
-        for city in sorted_cities:
-            city_lower = city.lower()
-            match_len = min(FIXED_MATCH_LEN, len(city_lower))
-            for word in entry_words:
-                try:
-                    if word[:match_len] == city_lower[:match_len]:
-                        location = city
-                        break
-                except IndexError:
-                    continue
-            if location:
-                break
-    
+        processed_entry['year'] = final_year_output  # Use the final year output here
+        return last_valid_year, last_valid_month
 
-        return {
-            'weekday': weekday,
-            'day': day,
-            'month': month,
-            'year': final_year_output,  # Use the final year output here
-            'time_start': time_start,
-            'time_end': time_end,
-            'tags': tags,
-            'location': location,
-        }, last_valid_year, last_valid_month
-    else:
-        return None, last_valid_year, last_valid_month
+    def parse(self, entry, last_valid_year, last_valid_month):
+        """Process one entry and return processed data along with the updated last_valid_year and last_valid_month."""
+        parsed = self.parse_fields(entry)
+
+        if parsed is None:
+            return None, last_valid_year, last_valid_month
+
+        processed_entry, year = parsed
+        last_valid_year, last_valid_month = self.resolve_year(processed_entry, year, last_valid_year, last_valid_month)
+        return processed_entry, last_valid_year, last_valid_month
+
+
+# Parsers built by the wrapper functions, keyed by their city list
+_parsers = {}
+
+
+def get_parser(cities=canonical_cities):
+    """Return a cached NoticeParser for the given city list."""
+    key = tuple(cities)
+    if key not in _parsers:
+        _parsers[key] = NoticeParser(cities)
+    return _parsers[key]
+
+
+def filter_prefix_keywords(tags_text):
+    """
+    Filters the raw text to return the full word matching the prefix criteria.
+    """
+    return get_parser().filter_prefix_keywords(tags_text)
+
+def process_data(entry, canonical_cities, last_valid_year, last_valid_month):
+    """Process each entry and return processed data along with the updated last_valid_year."""
+    return get_parser(canonical_cities).parse(entry, last_valid_year, last_valid_month)
 
 
 # Main function to process the raw JSON data
+def iter_raw_processor(raw_data, canonical_cities, last_valid_year=None, last_valid_month=12):
+    """Yield processed entries one at a time from any iterable of raw entries."""
+    parser = get_parser(canonical_cities)
+
+    for entry in raw_data:
+        processed_entry, last_valid_year, last_valid_month = parser.parse(entry, last_valid_year, last_valid_month)
+        if processed_entry:
+            yield processed_entry
+
+
 def raw_processor(raw_data, canonical_cities, last_valid_year=None, last_valid_month=12):
     """Process the raw JSON data (weekday, date, time)."""
+    return list(iter_raw_processor(raw_data, canonical_cities, last_valid_year, last_valid_month))
+
+
+def _parse_chunk(chunk, cities):
+    """Worker function: parse a chunk of raw entries without year inference."""
+    parser = get_parser(cities)
+    return [parser.parse_fields(entry) for entry in chunk]
+
+
+def raw_processor_parallel(raw_data, canonical_cities, last_valid_year=None, last_valid_month=12,
+                           workers=None, chunk_size=500):
+    """
+    Process the raw JSON data in a process pool.
+
+    The chunks are parsed in parallel without year inference, then a cheap
+    sequential pass carries last_valid_year / last_valid_month across the
+    whole list in the original order, so the output is identical to
+    raw_processor.
+    """
+    chunks = [raw_data[i:i + chunk_size] for i in range(0, len(raw_data), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed_chunks = list(executor.map(_parse_chunk, chunks, repeat(tuple(canonical_cities))))
+
     interim_data = []
-    
-    for entry in raw_data:
-        processed_entry, last_valid_year, last_valid_month = process_data(entry, canonical_cities, last_valid_year, last_valid_month)
-        if processed_entry:
+    for parsed_chunk in parsed_chunks:
+        for parsed in parsed_chunk:
+            if parsed is None:
+                continue
+            processed_entry, year = parsed
+            last_valid_year, last_valid_month = NoticeParser.resolve_year(
+                processed_entry, year, last_valid_year, last_valid_month
+            )
             interim_data.append(processed_entry)
 
     return interim_data
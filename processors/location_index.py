@@ -0,0 +1,81 @@
+import re
+
+# Only the first letters of a place name are compared, so inflected forms
+# ("Iisalmella", "Joensuun") still match the canonical name
+FIXED_MATCH_LEN = 5
+
+# A word of the entry: three or more Finnish letters between word boundaries
+WORD_PATTERN = r'\b[a-zåäö]{3,}\b'
+
+
+class LocationIndex:
+    """
+    Prefix trie over canonical place names and their aliases.
+
+    Each name is inserted by its first FIXED_MATCH_LEN lowercase letters. The
+    node where a name ends stores its rank in longest-name-first order, so the
+    lookup picks the same city as comparing every name against every word,
+    but only walks each word of the entry at most FIXED_MATCH_LEN steps deep,
+    no matter how many names are indexed.
+
+    Most words of a notice are street, village and customer names that appear
+    once, so caching per word does not pay off. Instead a single regex scan
+    returns only the words that start with an indexed prefix, and the trie
+    ranks those few.
+    """
+
+    def __init__(self, canonical_cities, aliases=None):
+        """
+        Args:
+            canonical_cities (list): Place names returned as locations.
+            aliases (dict): Optional alternative name -> canonical name.
+        """
+        names = [(city, city) for city in canonical_cities]
+        names += [(alias, city) for alias, city in (aliases or {}).items()]
+
+        # Longest names first, so the most specific name wins; sorted() is stable,
+        # so equally long names keep their list order
+        names = sorted(names, key=lambda name: len(name[0]), reverse=True)
+
+        self.cities = []
+        self.root = {}
+        prefixes = set()
+        for rank, (name, city) in enumerate(names):
+            self.cities.append(city)
+            prefix = name.lower()[:FIXED_MATCH_LEN]
+            prefixes.add(prefix)
+            node = self.root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            # Keep the best (lowest) rank when several names share a prefix
+            node.setdefault(None, rank)
+
+        # The lookahead only skips words no prefix can match; the words found
+        # are still exactly those of WORD_PATTERN, ranked by lookup_word
+        alternatives = '|'.join(re.escape(prefix) for prefix in sorted(prefixes, key=len, reverse=True))
+        self.candidate_re = re.compile(r'\b(?=' + alternatives + r')' + WORD_PATTERN[2:])
+
+    def lookup_word(self, word):
+        """Return the best rank of a name whose prefix starts `word`, or None."""
+        best = None
+        node = self.root
+        for char in word[:FIXED_MATCH_LEN]:
+            node = node.get(char)
+            if node is None:
+                break
+            rank = node.get(None)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+    def find(self, text):
+        """Return the canonical location mentioned in `text`, or None."""
+        best = None
+        for word in self.candidate_re.findall(text.lower()):
+            rank = self.lookup_word(word)
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                # Nothing can beat the longest name
+                if best == 0:
+                    break
+        return self.cities[best] if best is not None else None
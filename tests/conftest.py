@@ -0,0 +1,138 @@
+import asyncio
+import random
+import threading
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+import pytest
+from aiohttp import web
+
+from processors.json_processor import canonical_cities
+
+WEEKDAYS = ["Maanantaina", "Tiistaina", "Keskiviikkona", "Torstaina", "Perjantaina", "Lauantaina", "Sunnuntaina"]
+CAUSES = ["huoltotöiden", "saneeraustöiden", "kaivuutöiden", "vauriokorjauksen", "keskeytys", "sähkönjakelussa"]
+
+
+def synthetic_notices(size, seed):
+    """Notices shaped like the scraped ones, a fifth of them without a year."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        date = f"{rng.randint(1, 28)}.{rng.randint(1, 12)}"
+        if rng.random() > 0.2:
+            date += f".{rng.randint(2021, 2025)}"
+        start = rng.randint(6, 15)
+        corpus.append(
+            f"Tänään {rng.choice(WEEKDAYS)} {date} klo {start}.00–{start + rng.randint(1, 6)} "
+            f"{rng.choice(canonical_cities)}n alueella {rng.choice(CAUSES)} vuoksi"
+        )
+    return corpus
+
+
+@pytest.fixture
+def notice_corpus():
+    """Factory of synthetic notices in random order, with every 41st one replaced by text that does not parse."""
+    def make(size=300, seed=0):
+        corpus = synthetic_notices(size, seed)
+        random.Random(seed).shuffle(corpus)
+        corpus[::41] = ["Jär"] * len(corpus[::41])
+        return corpus
+    return make
+
+
+# Weather stations answered by the WFS stub: (fmisid, name, latitude, longitude)
+STATIONS = [
+    (101570, 'Kuopio Savilahti', 62.89, 27.63),
+    (101580, 'Iisalmi Runni', 63.52, 27.19),
+    (101421, 'Varkaus Kosulanniemi', 62.32, 27.92),
+]
+
+CANNED_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0" xmlns:gml="http://www.opengis.net/gml/3.2"
+    xmlns:gmlcov="http://www.opengis.net/gmlcov/1.0" xmlns:swe="http://www.opengis.net/swe/2.0">
+  <wfs:member>
+{points}
+    <gmlcov:positions>{positions}</gmlcov:positions>
+    <gml:doubleOrNilReasonTupleList>{values}</gml:doubleOrNilReasonTupleList>
+    <swe:DataRecord>
+      <swe:field name="t2m"><swe:label>Air temperature</swe:label><swe:uom code="degC"/></swe:field>
+    </swe:DataRecord>
+  </wfs:member>
+</wfs:FeatureCollection>
+"""
+
+
+def canned_multipoint_xml(start, end):
+    """Multipointcoverage XML with an hourly temperature of every stub station between `start` and `end`."""
+    times = pd.date_range(pd.Timestamp(start).ceil('h'), end, freq='h')
+    epochs = (times - pd.Timestamp('1970-01-01')) // pd.Timedelta(seconds=1)
+
+    points, positions, values = [], [], []
+    for fmisid, name, lat, lon in STATIONS:
+        points.append(f'    <gml:Point gml:id="point-{fmisid}"><gml:name>{name}</gml:name>'
+                      f'<gml:pos>{lat} {lon} </gml:pos></gml:Point>')
+        for epoch in epochs:
+            positions.append(f"{lat} {lon} {epoch}")
+            values.append(f"{np.sin(epoch / 86400) * 10 + lat - 60:.1f}")
+
+    return CANNED_TEMPLATE.format(points='\n'.join(points), positions='\n'.join(positions), values='\n'.join(values))
+
+
+@pytest.fixture
+def wfs_stations():
+    """Names of the stations in every answer of the WFS stub."""
+    return [name for _, name, _, _ in STATIONS]
+
+
+@pytest.fixture
+def wfs_stub():
+    """
+    Factory of local WFS stubs serving canned multipoint answers, each on its
+    own event loop thread. start(latency, fail_first, fail_status) returns
+    (base url, request counter); the first `fail_first` requests of every URL
+    get `fail_status`. Every stub is shut down after the test.
+    """
+    stubs = []
+
+    def start(latency=0, fail_first=0, fail_status=503):
+        counter = {'requests': 0, 'failed': 0}
+        seen = {}
+
+        async def handle(request):
+            counter['requests'] += 1
+            await asyncio.sleep(latency)
+            seen[request.path_qs] = seen.get(request.path_qs, 0) + 1
+            if seen[request.path_qs] <= fail_first:
+                counter['failed'] += 1
+                return web.Response(status=fail_status)
+
+            query = parse_qs(request.query_string)
+            xml = canned_multipoint_xml(
+                pd.Timestamp(query['starttime'][0]).tz_localize(None),
+                pd.Timestamp(query['endtime'][0]).tz_localize(None),
+            )
+            return web.Response(text=xml, content_type='text/xml')
+
+        app = web.Application()
+        app.router.add_get('/wfs', handle)
+        runner = web.AppRunner(app)
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        stubs.append((loop, thread, runner))
+        asyncio.run_coroutine_threadsafe(runner.setup(), loop).result()
+        asyncio.run_coroutine_threadsafe(web.TCPSite(runner, '127.0.0.1', 0).start(), loop).result()
+
+        port = runner.addresses[0][1]
+        base_url = f"http://127.0.0.1:{port}/wfs?service=WFS&version=2.0.0&request=getFeature&storedquery_id="
+        return base_url, counter
+
+    yield start
+
+    for loop, thread, runner in stubs:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
@@ -0,0 +1,40 @@
+import glob
+import os
+
+import pytest
+
+from generators.extractors import EXTRACTORS, extract_html_parser, extract_strainer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'listing_pages')
+PAGES = sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+
+
+def read_page(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_fixtures_have_notices():
+    notices = [notice for path in PAGES for notice in extract_html_parser(read_page(path))]
+
+    assert len(PAGES) >= 3
+    assert len(notices) == 13
+    assert not any(notice.startswith('Ei poimita') for notice in notices)
+
+
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+def test_strainer_matches_html_parser(path):
+    content = read_page(path)
+
+    assert extract_strainer(content) == extract_html_parser(content)
+
+
+@pytest.mark.parametrize('path', PAGES, ids=os.path.basename)
+def test_lxml_matches_html_parser(path):
+    if 'lxml' not in EXTRACTORS:
+        pytest.skip("lxml is not installed")
+    content = read_page(path)
+    # libxml2 turns CRLF line breaks inside a notice into LF
+    expected = [notice.replace('\r\n', '\n') for notice in extract_html_parser(content)]
+
+    assert EXTRACTORS['lxml'](content) == expected
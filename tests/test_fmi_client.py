@@ -0,0 +1,61 @@
+import aiohttp
+import pandas as pd
+import pytest
+
+from api.fmi_client import FMIClient
+from api.weather import MULTIPOINT_QUERY, SERVICE_AREA_BBOX, observation_window_args
+
+
+def day_calls(days):
+    """One multipoint query per day window."""
+    return [(MULTIPOINT_QUERY, observation_window_args(day, day + pd.Timedelta(hours=23), SERVICE_AREA_BBOX))
+            for day in pd.date_range('2024-01-01', periods=days, freq='D')]
+
+
+def test_identical_queries_share_one_request(wfs_stub, wfs_stations):
+    base_url, counter = wfs_stub(latency=0.05)
+    client = FMIClient(base_url=base_url, max_concurrency=4)
+
+    results = client.query_many(day_calls(5) * 10)
+
+    assert counter['requests'] == 5
+    assert client.stats == {'requests': 5, 'coalesced': 45, 'retried': 0}
+    assert all(set(result.location_metadata) == set(wfs_stations) for result in results)
+    # Copies of a query get the same window
+    station = wfs_stations[0]
+    assert results[5].data[station]['times'] == results[0].data[station]['times']
+    assert results[1].data[station]['times'] != results[0].data[station]['times']
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_transient_failures_are_retried(status, wfs_stub):
+    base_url, counter = wfs_stub(latency=0, fail_first=2, fail_status=status)
+    client = FMIClient(base_url=base_url, max_concurrency=4, backoff=0.01)
+
+    results = client.query_many(day_calls(3))
+
+    assert not any(isinstance(result, Exception) for result in results)
+    assert counter == {'requests': 9, 'failed': 6}
+    assert client.stats == {'requests': 9, 'coalesced': 0, 'retried': 6}
+
+
+def test_retries_give_up_with_the_last_error(wfs_stub):
+    base_url, counter = wfs_stub(latency=0, fail_first=10, fail_status=503)
+    client = FMIClient(base_url=base_url, retries=2, backoff=0.01)
+
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        client(*day_calls(1)[0])
+
+    assert error.value.status == 503
+    assert counter['requests'] == 3
+
+
+def test_client_errors_are_not_retried(wfs_stub):
+    base_url, counter = wfs_stub(latency=0, fail_first=10, fail_status=404)
+    client = FMIClient(base_url=base_url, backoff=0.01)
+
+    results = client.query_many(day_calls(2))
+
+    assert [result.status for result in results] == [404, 404]
+    assert counter['requests'] == 2
+    assert client.stats['retried'] == 0
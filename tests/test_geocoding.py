@@ -0,0 +1,64 @@
+import math
+
+from api.geocoding import Gazetteer, Geocoder, StubProvider
+
+# Not in the bundled gazetteer
+VILLAGE = 'Kylä Testilä'
+VILLAGE_COORDINATES = (62.5, 27.5)
+
+
+def test_gazetteer_hits_skip_the_provider():
+    provider = StubProvider()
+    geocoder = Geocoder(Gazetteer(':memory:'), provider)
+
+    result = geocoder.geocode_many(['Iisalmi', ' joensuu ', 'Iisalmi', math.nan])
+
+    assert list(result) == ['Iisalmi', ' joensuu ']
+    assert result['Iisalmi'] == (63.559, 27.19)
+    assert result[' joensuu '] == (62.601, 29.763)
+    assert provider.calls == 0
+
+
+def test_misses_fall_back_to_the_provider():
+    provider = StubProvider({VILLAGE: VILLAGE_COORDINATES})
+    geocoder = Geocoder(Gazetteer(':memory:'), provider)
+
+    result = geocoder.geocode_many(['Iisalmi', VILLAGE, 'Tuntematon paikka'])
+
+    assert result[VILLAGE] == VILLAGE_COORDINATES
+    assert result['Tuntematon paikka'] == (None, None)
+    assert provider.calls == 2
+
+
+def test_without_provider_misses_are_unresolved():
+    result = Geocoder(Gazetteer(':memory:')).geocode_many([VILLAGE])
+
+    assert result == {VILLAGE: (None, None)}
+
+
+def test_resolved_names_are_cached(tmp_path):
+    path = str(tmp_path / 'gazetteer.sqlite')
+    provider = StubProvider({VILLAGE: VILLAGE_COORDINATES})
+    geocoder = Geocoder(Gazetteer(path), provider)
+
+    geocoder.geocode_many([VILLAGE])
+    assert geocoder.geocode_many([VILLAGE, VILLAGE.upper()]) == {
+        VILLAGE: VILLAGE_COORDINATES, VILLAGE.upper(): VILLAGE_COORDINATES,
+    }
+    assert provider.calls == 1
+    geocoder.gazetteer.close()
+
+    # The store persists across runs
+    provider = StubProvider()
+    assert Geocoder(Gazetteer(path), provider).geocode_many([VILLAGE]) == {VILLAGE: VILLAGE_COORDINATES}
+    assert provider.calls == 0
+
+
+def test_unresolved_names_are_asked_again():
+    provider = StubProvider()
+    geocoder = Geocoder(Gazetteer(':memory:'), provider)
+
+    geocoder.geocode_many([VILLAGE])
+    geocoder.geocode_many([VILLAGE])
+
+    assert provider.calls == 2
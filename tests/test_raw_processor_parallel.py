@@ -0,0 +1,44 @@
+import pytest
+
+from processors.json_processor import canonical_cities, get_parser, raw_processor, raw_processor_parallel
+
+# One notice per chunk, a small odd size, and a single chunk larger than the corpus
+CORPUS_SIZE = 300
+CHUNK_SIZES = [1, 7, CORPUS_SIZE + 1]
+
+
+def year_crosses_boundary(corpus, chunk_size):
+    """True if a chunk starts with a notice without a year, inheriting one from an earlier chunk."""
+    parser = get_parser(canonical_cities)
+    seen_year = False
+    for i, entry in enumerate(corpus):
+        parsed = parser.parse_fields(entry)
+        if parsed is None:
+            continue
+        if i % chunk_size == 0 and seen_year and not parsed[1]:
+            return True
+        seen_year = seen_year or bool(parsed[1])
+    return False
+
+
+@pytest.mark.parametrize('chunk_size', CHUNK_SIZES)
+def test_parallel_matches_serial(chunk_size, notice_corpus, capsys):
+    corpus = notice_corpus(CORPUS_SIZE)
+    if chunk_size < len(corpus):
+        assert year_crosses_boundary(corpus, chunk_size)
+
+    serial = raw_processor(corpus, canonical_cities)
+    serial_output = capsys.readouterr().out
+    parallel = raw_processor_parallel(corpus, canonical_cities, workers=2, chunk_size=chunk_size)
+
+    assert parallel == serial
+    # The year inference prints the same lines in the same order
+    assert capsys.readouterr().out == serial_output
+
+
+def test_parallel_keeps_initial_year(notice_corpus):
+    corpus = notice_corpus(CORPUS_SIZE, seed=1)
+    serial = raw_processor(corpus, canonical_cities, last_valid_year='2022', last_valid_month='6')
+    parallel = raw_processor_parallel(corpus, canonical_cities, last_valid_year='2022', last_valid_month='6',
+                                      chunk_size=7)
+    assert parallel == serial
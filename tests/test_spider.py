@@ -0,0 +1,94 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from generators.spider import (FIRST_PAGE, LAST_PAGE, TokenBucket, create_session, extract_outage_data,
+                               scrape_outage_data, scrape_outage_data_concurrent)
+
+
+def page_notices(page_number):
+    return [f"Tiistaina {page_number}.{i}. klo 8–10 Iisalmi huoltotöiden vuoksi" for i in range(1, 4)]
+
+
+def page_html(page_number):
+    cards = ''.join(f'<div class="uutisnosto-sisalto sisennys"><h2>Häiriö</h2><p>{notice}</p></div>'
+                    for notice in page_notices(page_number))
+    return f'<html><body><div class="uutisnosto">{cards}</div></body></html>'.encode('utf-8')
+
+
+@pytest.fixture
+def site():
+    """
+    Listing pages served by http.server. Earlier pages answer more slowly, so
+    the worker threads finish out of page order; pages in `throttled` answer 429.
+    """
+    state = {'throttled': set(), 'requests': []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            page_number = int(self.path.rstrip('/').rsplit('/', 1)[-1])
+            state['requests'].append(page_number)
+            time.sleep(0.02 * (LAST_PAGE - page_number) / LAST_PAGE)
+            if page_number in state['throttled']:
+                self.send_response(429)
+                self.end_headers()
+                return
+            body = page_html(page_number)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state['base_url'] = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_concurrent_crawl_keeps_page_order(site):
+    outages = scrape_outage_data_concurrent(2, 12, workers=4, rate=1000, base_url=site['base_url'])
+
+    assert outages == [notice for page in range(2, 13) for notice in page_notices(page)]
+    assert sorted(site['requests']) == list(range(2, 13))
+
+
+def test_workers_crawl_matches_page_order(site):
+    outages = scrape_outage_data(workers=4, rate=1000, base_url=site['base_url'])
+
+    assert outages == [notice for page in range(FIRST_PAGE, LAST_PAGE + 1) for notice in page_notices(page)]
+
+
+def test_throttled_page_backs_off(site):
+    site['throttled'].add(3)
+    bucket = TokenBucket(rate=80, capacity=1)
+    session = create_session(pool_size=1)
+
+    assert extract_outage_data(2, session, site['base_url'], bucket) == page_notices(2)
+    assert bucket.rate == 80
+
+    # 429: the page is given up and the request rate halved
+    assert extract_outage_data(3, session, site['base_url'], bucket) == []
+    assert bucket.rate == 40
+
+    # Successful responses recover the rate slowly, never above the original
+    extract_outage_data(4, session, site['base_url'], bucket)
+    assert bucket.rate == pytest.approx(44)
+    for page_number in range(5, 15):
+        extract_outage_data(page_number, session, site['base_url'], bucket)
+    assert bucket.rate == 80
+
+
+def test_throttled_page_in_concurrent_crawl(site):
+    site['throttled'].add(5)
+    outages = scrape_outage_data_concurrent(2, 8, workers=3, rate=1000, base_url=site['base_url'])
+
+    assert outages == [notice for page in (2, 3, 4, 6, 7, 8) for notice in page_notices(page)]
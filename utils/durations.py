@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+MINUTES_PER_DAY = 24 * 60
+
+# Clock strings are at most "HH:MM"; one extra character shows a longer value
+_CLOCK_WIDTH = 6
+_ZERO, _NINE, _DOT, _COLON = ord('0'), ord('9'), ord('.'), ord(':')
+
+
+def parse_clock(times):
+    """
+    Parse clock strings ("7", "07", "7.30", "07:30") into minutes after midnight.
+
+    There are only a few hundred distinct clock strings, so the values are
+    factorized first and only the unique strings are parsed. "24" is accepted
+    as the end of the day.
+
+    Args:
+        times (array-like): Clock strings; None, NaN, "Unknown" etc. are allowed.
+
+    Returns:
+        np.ndarray: float minutes, NaN where the value is not a valid time.
+    """
+    return _parse_distinct(times, _parse_clock_strings)
+
+
+def _parse_distinct(values, parse):
+    """
+    Apply `parse` (object array -> float array) to the distinct values only
+    and spread the results back to every row.
+    """
+    if not isinstance(values, pd.Series):
+        values = np.asarray(values, dtype=object)
+    # A Series is factorized as is: converting string columns to objects costs more than the parsing
+    labels, uniques = pd.factorize(values)
+    parsed = np.append(parse(np.asarray(uniques, dtype=object)), np.nan)
+    # Missing values get label -1, which picks the NaN appended above
+    return parsed[labels]
+
+
+def _parse_clock_strings(values):
+    """
+    Parse an array of clock strings without per-row Python work: the strings
+    are cast to a fixed width unicode array and read as integer code points.
+    """
+    codes = (
+        values.astype(f'U{_CLOCK_WIDTH}')
+        .view(np.uint32)
+        .reshape(len(values), _CLOCK_WIDTH)
+        .astype(np.int32)
+    )
+
+    length = np.count_nonzero(codes, axis=1)
+    digits = codes - _ZERO
+    is_digit = (codes >= _ZERO) & (codes <= _NINE)
+    is_sep = (codes == _DOT) | (codes == _COLON)
+
+    hours = np.full(len(values), -1, dtype=np.int32)
+    minutes = np.zeros(len(values), dtype=np.int32)
+
+    # "H"
+    mask = (length == 1) & is_digit[:, 0]
+    hours[mask] = digits[mask, 0]
+
+    # "HH"
+    mask = (length == 2) & is_digit[:, 0] & is_digit[:, 1]
+    hours[mask] = digits[mask, 0] * 10 + digits[mask, 1]
+
+    # "H.MM" / "H:MM"
+    mask = (length == 4) & is_digit[:, 0] & is_sep[:, 1] & is_digit[:, 2] & is_digit[:, 3]
+    hours[mask] = digits[mask, 0]
+    minutes[mask] = digits[mask, 2] * 10 + digits[mask, 3]
+
+    # "HH.MM" / "HH:MM"
+    mask = (length == 5) & is_digit[:, 0] & is_digit[:, 1] & is_sep[:, 2] & is_digit[:, 3] & is_digit[:, 4]
+    hours[mask] = digits[mask, 0] * 10 + digits[mask, 1]
+    minutes[mask] = digits[mask, 3] * 10 + digits[mask, 4]
+
+    total = hours * 60 + minutes
+    valid = (hours >= 0) & (minutes < 60) & (total <= MINUTES_PER_DAY)
+    return np.where(valid, total, np.nan)
+
+
+def duration_hours(time_start, time_end):
+    """
+    Outage duration in hours from start and end clock strings.
+
+    An end time earlier than the start time means the outage continued past
+    midnight, so a day is added.
+
+    Returns:
+        np.ndarray: float hours, NaN if either time is invalid.
+    """
+    return _duration_minutes(parse_clock(time_start), parse_clock(time_end)) / 60
+
+
+def _duration_minutes(start, end):
+    minutes = end - start
+    return np.where(minutes < 0, minutes + MINUTES_PER_DAY, minutes)
+
+
+def _timedelta(minutes):
+    """Float minutes as timedelta64[us], NaT where NaN."""
+    valid = ~np.isnan(minutes)
+    deltas = np.full(len(minutes), np.timedelta64('NaT'), dtype='timedelta64[us]')
+    deltas[valid] = np.rint(minutes[valid] * 60_000_000).astype(np.int64)
+    return deltas
+
+
+def parse_year(years):
+    """Integer year from values like 2024, "2024" or "2024 (Puuttuva vuosi ...)"; NaN if missing."""
+    return _parse_distinct(years, _parse_year_strings)
+
+
+def _parse_year_strings(values):
+    text = pd.Series(values, dtype=object).astype('string')
+    return pd.to_numeric(text.str.slice(0, 4), errors='coerce').to_numpy(dtype=float)
+
+
+def parse_number(values):
+    """Numbers from values like 5 or "05" (day and month columns); NaN if not numeric."""
+    return _parse_distinct(values, lambda uniques: pd.to_numeric(pd.Series(uniques), errors='coerce').to_numpy(dtype=float))
+
+
+def parse_date(years, months, days):
+    """
+    Day timestamps from year, month and day values.
+
+    Only the distinct dates, a few thousand, are assembled by pandas.
+
+    Returns:
+        np.ndarray: datetime64 days, NaT where the date is missing or invalid.
+    """
+    year, month, day = parse_year(years), parse_number(months), parse_number(days)
+    # One key per date; values that do not fit two digits (or are not integers) are invalid anyway
+    encodable = (month >= 0) & (month < 100) & (day >= 0) & (day < 100) & (month % 1 == 0) & (day % 1 == 0)
+    key = np.where(encodable, year * 10000 + month * 100 + day, np.nan)
+
+    labels, uniques = pd.factorize(key)
+    uniques = np.asarray(uniques, dtype=float)
+    dates = pd.to_datetime(
+        pd.DataFrame({'year': uniques // 10000, 'month': uniques // 100 % 100, 'day': uniques % 100}),
+        errors='coerce'
+    ).to_numpy()
+    return np.append(dates, np.array(['NaT'], dtype=dates.dtype))[labels]
+
+
+def add_duration_columns(df):
+    """
+    Add the canonical time columns to an outage DataFrame with day, month,
+    year, time_start and time_end columns.
+
+    Adds:
+        start_dt: start timestamp on the outage day (NaT if invalid)
+        end_dt: start_dt + duration, so it falls on the next day after midnight
+        duration_hours: the canonical outage duration
+
+    Returns:
+        pd.DataFrame: A copy of `df` with the new columns.
+    """
+    df = df.copy()
+
+    day_start = parse_date(df['year'], df['month'], df['day']).astype('datetime64[us]')
+    start_minutes = parse_clock(df['time_start'])
+    minutes = _duration_minutes(start_minutes, parse_clock(df['time_end']))
+
+    # Timestamps are added in numpy; pd.to_timedelta of float minutes is slower than the parsing
+    df['start_dt'] = day_start + _timedelta(start_minutes)
+    df['end_dt'] = df['start_dt'].to_numpy() + _timedelta(minutes)
+    df['duration_hours'] = minutes / 60
+
+    return df
@@ -0,0 +1,258 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Backpressure policies of a subscription whose queue is full
+BLOCK = 'block'              # the publisher waits for room (the consumer must keep up)
+DROP_OLDEST = 'drop_oldest'  # the oldest queued event is dropped
+COALESCE = 'coalesce'        # a queued event with the same key is replaced by the newer one
+POLICIES = (BLOCK, DROP_OLDEST, COALESCE)
+
+DEFAULT_QUEUE_SIZE = 1024
+
+
+class Closed(Exception):
+    """Raised by Subscription.get once the subscription is closed and drained."""
+
+
+class Subscription:
+    """
+    One consumer's bounded queue on an EventBus.
+
+    Events are the published objects themselves, shared by every
+    subscription without copying, so consumers must not modify them.
+    Iterating a subscription yields its events (lists of up to
+    `batch_size` with batching) until the bus is closed and the queue drained.
+
+    Args:
+        policy (str): What happens when the queue is full, see POLICIES.
+        key (callable): With COALESCE, the key of an event; only the newest
+                        event per key is kept, at the queue position of the
+                        first one. None coalesces everything to the latest event.
+        block_timeout (float): With BLOCK, seconds the publisher waits for room
+                               before dropping the event; None waits indefinitely.
+    """
+
+    def __init__(self, name, maxsize=DEFAULT_QUEUE_SIZE, policy=DROP_OLDEST, key=None, batch_size=1,
+                 block_timeout=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key or (lambda event: None)
+        self.batch_size = batch_size
+        self.block_timeout = block_timeout
+
+        # (sequence number, publish time, event); keyed by the event key when coalescing
+        self.queue = OrderedDict() if policy == COALESCE else deque()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.published = 0
+        self.latest_sequence = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.last_sequence = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def offer(self, sequence, published_at, event):
+        """Queue an event according to the policy (called by EventBus.publish)."""
+        entry = (sequence, published_at, event)
+        with self.condition:
+            if self.closed:
+                return
+            self.published += 1
+            self.latest_sequence = sequence
+
+            if self.policy == COALESCE:
+                key = self.key(event)
+                if key in self.queue:
+                    self.queue[key] = entry
+                    self.coalesced += 1
+                    return
+                if len(self.queue) >= self.maxsize:
+                    self.queue.popitem(last=False)
+                    self.dropped += 1
+                self.queue[key] = entry
+
+            else:
+                if len(self.queue) >= self.maxsize and self.policy == BLOCK:
+                    if not self.condition.wait_for(lambda: len(self.queue) < self.maxsize or self.closed,
+                                                   self.block_timeout):
+                        self.dropped += 1
+                        return
+                    if self.closed:
+                        return
+                if len(self.queue) >= self.maxsize:
+                    self.queue.popleft()
+                    self.dropped += 1
+                self.queue.append(entry)
+
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify_all()
+
+    def _pop(self):
+        if self.policy == COALESCE:
+            return self.queue.popitem(last=False)[1]
+        return self.queue.popleft()
+
+    def get(self, timeout=None):
+        """
+        Next events: one event, or a list of up to `batch_size` events.
+
+        Returns None if `timeout` passes with nothing queued; raises Closed
+        once the subscription is closed and drained.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.queue or self.closed, timeout):
+                return None
+            if not self.queue:
+                raise Closed(self.name)
+
+            entries = [self._pop() for _ in range(min(self.batch_size, len(self.queue)))]
+            sequence, published_at, _ = entries[-1]
+            self.delivered += len(entries)
+            self.last_sequence = sequence
+            self.last_lag_seconds = time.monotonic() - entries[0][1]
+            self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+            # Room for a blocked publisher
+            self.condition.notify_all()
+
+        events = [event for _, _, event in entries]
+        return events[0] if self.batch_size == 1 else events
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.get()
+            except Closed:
+                return
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stats(self):
+        """
+        Counters and lag of the subscription.
+
+        lag_events is how many events were published after the last one
+        delivered (queued or dropped); lag_seconds is the age of the oldest
+        queued event.
+        """
+        with self.condition:
+            entries = self.queue.values() if self.policy == COALESCE else self.queue
+            oldest = time.monotonic() - next(iter(entries))[1] if self.queue else 0.0
+            return {
+                'subscriber': self.name,
+                'policy': self.policy,
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'coalesced': self.coalesced,
+                'depth': len(self.queue),
+                'max_depth': self.max_depth,
+                'lag_events': self.latest_sequence - self.last_sequence,
+                'lag_seconds': oldest,
+                'max_lag_seconds': self.max_lag_seconds,
+            }
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for the outage stream.
+
+    Every published event is offered to each subscription's bounded queue;
+    a slow consumer only affects its own queue (by its policy), so with
+    DROP_OLDEST or COALESCE it never stalls the publisher. BLOCK is for
+    consumers that must see every event, such as a file sink.
+    """
+
+    def __init__(self):
+        self.subscriptions = []
+        self.lock = threading.Lock()
+        self.sequence = 0
+
+    def subscribe(self, name, **options):
+        """Add a subscription (see Subscription for the options) and return it."""
+        subscription = Subscription(name, **options)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+        subscription.close()
+
+    def publish(self, event):
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+        published_at = time.monotonic()
+        # The list is replaced, not modified, on (un)subscribe, so it can be read without the lock
+        for subscription in self.subscriptions:
+            subscription.offer(sequence, published_at, event)
+        return sequence
+
+    def pump(self, stream, close=True):
+        """
+        Publish every event of `stream` (e.g. an OutageReplay; batches are
+        published as single events) and close the bus at the end.
+
+        Returns:
+            int: Number of events published.
+        """
+        count = 0
+        try:
+            for item in stream:
+                for event in (item if isinstance(item, list) else [item]):
+                    self.publish(event)
+                    count += 1
+        finally:
+            if close:
+                self.close()
+        return count
+
+    def close(self):
+        """Close every subscription; consumers finish what is queued and stop."""
+        for subscription in self.subscriptions:
+            subscription.close()
+
+    def stats(self):
+        return [subscription.stats() for subscription in self.subscriptions]
+
+
+def start_reader(subscription, reader, *args):
+    """
+    Run `reader(subscription, *args)`, a function that consumes the whole
+    subscription (e.g. write_jsonl), in a daemon thread. The subscription is
+    closed when the reader returns or raises, so a failed consumer stops
+    receiving events instead of blocking the publisher.
+    """
+    def run():
+        try:
+            reader(subscription, *args)
+        finally:
+            subscription.close()
+
+    thread = threading.Thread(target=run, name=f"consumer-{subscription.name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_consumer(subscription, handler):
+    """
+    Call `handler` with every event (or batch) of `subscription` in a
+    daemon thread, until the subscription is closed and drained.
+    """
+    def consume(events_iter):
+        for events in events_iter:
+            handler(events)
+
+    return start_reader(subscription, consume)
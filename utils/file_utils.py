@@ -1,7 +1,14 @@
 import os
+import io
+import gzip
 import json
 
-print("Reached file_utils.py")
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None
+
+
 def save_to_json(data, filename):
     """
     Save the provided data to a JSON file.
@@ -17,3 +24,120 @@ def save_to_json(data, filename):
         json.dump(data, file, indent=4)
     
     print(f"Data saved to {filename}")
+
+
+def ensure_parent_dir(filename):
+    """Create the directory of `filename` if it has one and it is missing."""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def open_text(filename, mode='r'):
+    """
+    Open a text file for reading ('r') or writing ('w'), compressed with gzip
+    or zstd if the name ends in .gz or .zst.
+    """
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode + 't', encoding='utf-8')
+
+    if filename.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError("zstandard must be installed to read or write .zst files")
+        binary = open(filename, mode + 'b')
+        if mode == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(binary, closefd=True)
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(binary, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+
+    return open(filename, mode, encoding='utf-8')
+
+
+def is_jsonl(filename):
+    """Return True if the file name has a JSON Lines extension (optionally compressed)."""
+    for suffix in ('.gz', '.zst'):
+        if filename.endswith(suffix):
+            filename = filename[:-len(suffix)]
+    return filename.endswith('.jsonl')
+
+
+def read_jsonl(filename):
+    """
+    Yield the records of a JSON Lines file one at a time.
+
+    :param filename: Path to a .jsonl, .jsonl.gz or .jsonl.zst file.
+    """
+    with open_text(filename, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def write_jsonl(records, filename):
+    """
+    Write records to a JSON Lines file as they are produced.
+
+    :param records: Any iterable of JSON serializable records, e.g. a generator.
+    :param filename: Path to a .jsonl, .jsonl.gz or .jsonl.zst file.
+    :return: The number of records written.
+    """
+    ensure_parent_dir(filename)
+
+    count = 0
+    with open_text(filename, 'w') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+
+    print(f"{count} records saved to {filename}")
+    return count
+
+
+def read_records(filename):
+    """
+    Yield the records of a dataset file, streaming JSON Lines files and
+    loading pretty-printed JSON lists in one go.
+    """
+    if is_jsonl(filename):
+        yield from read_jsonl(filename)
+    else:
+        with open(filename, 'r', encoding='utf-8') as file:
+            yield from json.load(file)
+
+
+def save_records(records, filename, ensure_ascii=True):
+    """
+    Save records in the format given by the file extension: JSON Lines for
+    .jsonl(.gz/.zst), otherwise a pretty-printed JSON list (export format).
+
+    Args:
+        ensure_ascii (bool): Escape non-ASCII characters in the JSON list
+            format, as save_to_json does; JSON Lines are always written as UTF-8.
+    """
+    if is_jsonl(filename):
+        return write_jsonl(records, filename)
+
+    records = list(records)
+    ensure_parent_dir(filename)
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(records, file, ensure_ascii=ensure_ascii, indent=4)
+
+    print(f"Data saved to {filename}")
+    return len(records)
+
+
+def tee_records(records, filename):
+    """
+    Pass records through unchanged while writing each one to a JSON Lines file,
+    so an intermediate stage can be saved without materializing it.
+    """
+    ensure_parent_dir(filename)
+
+    with open_text(filename, 'w') as file:
+        for record in records:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            yield record
+
+    print(f"Records saved to {filename}")
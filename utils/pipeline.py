@@ -0,0 +1,221 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+STATE_PATH = 'data/.pipeline_state.json'
+
+
+class Stage:
+    """
+    One step of the pipeline.
+
+    Args:
+        name (str): Unique stage name.
+        func (callable): Module level function that does the work (it is run
+                         in a worker process, so it must be picklable).
+        inputs (list): Files the stage reads.
+        outputs (list): Files the stage writes.
+        deps (list): Names of the stages that must run first.
+        code (list): Source files whose changes invalidate the stage, in
+                     addition to the source of `func` itself.
+        kwargs (dict): Keyword arguments passed to `func`.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), deps=(), code=(), kwargs=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.code = list(code)
+        self.kwargs = kwargs or {}
+
+    def fingerprint(self):
+        """Hash of the stage's input files, code and arguments."""
+        digest = hashlib.sha256()
+        digest.update(inspect.getsource(self.func).encode('utf-8'))
+        digest.update(json.dumps(self.kwargs, sort_keys=True, default=str).encode('utf-8'))
+
+        for path in self.code + self.inputs:
+            digest.update(path.encode('utf-8'))
+            try:
+                with open(path, 'rb') as file:
+                    for block in iter(lambda: file.read(1 << 20), b''):
+                        digest.update(block)
+            except FileNotFoundError:
+                digest.update(b'<missing>')
+
+        return digest.hexdigest()
+
+
+def _run_stage(func, kwargs):
+    """Worker process entry point: run a stage and return its wall time."""
+    start = time.perf_counter()
+    func(**kwargs)
+    return time.perf_counter() - start
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, skipping stages whose fingerprint is
+    unchanged since their last successful run and whose outputs exist.
+    Stages whose dependencies are done run in parallel worker processes.
+    """
+
+    def __init__(self, stages, state_path=STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, indent=4)
+
+    def validate(self, names):
+        """Raise ValueError listing the valid stages if any of `names` is not a stage."""
+        unknown = [name for name in names if name not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(unknown)}. "
+                             f"Valid stages: {', '.join(self._order(self.stages))}")
+
+    def _select(self, targets):
+        """Return the names of `targets` and everything they depend on."""
+        if not targets:
+            return set(self.stages)
+
+        selected = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.stages[name].deps)
+        return selected
+
+    def is_up_to_date(self, stage, state):
+        """
+        A stage is up to date if its outputs exist and its fingerprint matches
+        the last run. Source stages (no inputs, e.g. scraping) only need their
+        outputs to exist; re-run them with force.
+        """
+        if not all(os.path.exists(path) for path in stage.outputs):
+            return False
+        if not stage.inputs:
+            return True
+        return state.get(stage.name) == stage.fingerprint()
+
+    def run(self, targets=None, force=(), workers=None):
+        """
+        Run the pipeline.
+
+        Args:
+            targets (list): Stages to bring up to date (default: all).
+            force (list): Stages to run even if they are up to date; True forces all.
+            workers (int): Maximum number of stages running at once.
+
+        Returns:
+            dict: stage name -> (status, seconds), status being 'ran',
+                  'skipped', 'failed' or 'blocked'.
+        """
+        self.validate(targets or ())
+        if force is not True:
+            self.validate(force)
+
+        selected = self._select(targets)
+        state = self._load_state()
+        report = {}
+        done = set()
+        running = {}
+
+        def ready():
+            return [
+                name for name in selected
+                if name not in report and name not in running.values()
+                and all(dep in done for dep in self.stages[name].deps)
+            ]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                for name in sorted(ready()):
+                    stage = self.stages[name]
+                    # A stage must re-run if anything upstream of it re-ran
+                    upstream_ran = any(report[dep][0] == 'ran' for dep in stage.deps)
+                    forced = force is True or name in force
+
+                    if not forced and not upstream_ran and self.is_up_to_date(stage, state):
+                        print(f"[{name}] up to date, skipping")
+                        report[name] = ('skipped', 0.0)
+                        done.add(name)
+                        continue
+
+                    print(f"[{name}] running...")
+                    running[executor.submit(_run_stage, stage.func, stage.kwargs)] = name
+
+                if not running:
+                    # Nothing is running and nothing more can start
+                    if not ready():
+                        break
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        seconds = future.result()
+                    except Exception as e:
+                        print(f"[{name}] failed: {e}")
+                        report[name] = ('failed', 0.0)
+                        continue
+
+                    report[name] = ('ran', seconds)
+                    done.add(name)
+                    # Fingerprint after the run, so it reflects the inputs the stage actually used
+                    state[name] = self.stages[name].fingerprint()
+                    self._save_state(state)
+
+        # Stages downstream of a failure never became ready
+        for name in selected - set(report):
+            report[name] = ('blocked', 0.0)
+
+        self.print_report(report)
+        return report
+
+    def print_report(self, report):
+        """Print the status and wall time of every stage."""
+        print("\nStage timings:")
+        for name in self._order(report):
+            status, seconds = report[name]
+            print(f"  {name:20s} {status:8s} {seconds:8.2f} s")
+
+    def _order(self, names):
+        """Return `names` in a dependency respecting order."""
+        ordered = []
+        visited = set()
+
+        def visit(name):
+            if name in visited:
+                return
+            visited.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            if name in names:
+                ordered.append(name)
+
+        for name in sorted(names):
+            visit(name)
+        return ordered